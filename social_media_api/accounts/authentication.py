@@ -0,0 +1,88 @@
+"""
+Token authentication with an in-process token -> user cache.
+
+DRF's TokenAuthentication runs a Token JOIN User query on every request.
+CachedTokenAuthentication keeps a bounded LRU of recent lookups for
+TOKEN_AUTH_CACHE_TTL seconds and hands each request its own copy of the
+cached user. Entries are dropped when a token is deleted or its user is
+saved (deactivation, password change, ...). The cache is per process, so
+other workers may serve a revoked token until their entry expires.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, user = entry
+            if time.monotonic() >= expires:
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+        return copy.copy(user)
+
+    def put(self, key, user):
+        ttl = getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60)
+        size = getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000)
+        if not ttl or not size:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + ttl, copy.copy(user))
+            self._keys_by_user[user.pk].add(key)
+            while len(self._entries) > size:
+                self._pop(next(iter(self._entries)))
+
+    def discard(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1].pk
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None:
+            return (user, Token(key=key, user=user))
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.put(key, user)
+        return (user, token)
@@ -0,0 +1,110 @@
+"""
+Streaming export of everything stored about one account.
+
+Each section is read with a values() projection through .iterator(), so rows
+are encoded and sent as they are fetched and memory use does not grow with
+the size of the account. Output is either one NDJSON stream, where every
+line carries a "type", or a zip archive with one NDJSON file per section,
+written through a sink that hands compressed bytes back after each row.
+"""
+import io
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from notifications.models import Notification, NotificationArchive
+from posts.models import Comment, Like, Post
+
+from .models import User
+
+Follow = User.followers.through
+
+
+def _sections(user):
+    """(name, queryset) pairs making up an account export, in output order."""
+    return [
+        ('profile', User.objects.filter(pk=user.pk).values(
+            'id', 'username', 'email', 'first_name', 'last_name', 'bio',
+            'profile_picture', 'date_joined', 'last_login',
+            'follower_count', 'following_count'
+        )),
+        ('posts', Post.objects.filter(author=user).order_by('id').values(
+            'id', 'title', 'content', 'created_at', 'updated_at',
+            'like_count', 'comment_count'
+        )),
+        ('comments', Comment.objects.filter(author=user).order_by('id').values(
+            'id', 'post_id', 'content', 'created_at', 'updated_at'
+        )),
+        ('likes', Like.objects.filter(user=user).order_by('id').values(
+            'post_id', 'created_at'
+        )),
+        # Through-table rows read as (from_user=author, to_user=follower).
+        ('followers', Follow.objects.filter(from_user_id=user.pk).order_by('id').values(
+            user_id=F('to_user_id'), username=F('to_user__username')
+        )),
+        ('following', Follow.objects.filter(to_user_id=user.pk).order_by('id').values(
+            user_id=F('from_user_id'), username=F('from_user__username')
+        )),
+        ('notifications', Notification.objects.filter(recipient=user).order_by('id').values(
+            'id', 'actor_id', 'verb', 'actor_count', 'object_id', 'is_read', 'timestamp',
+            actor_username=F('actor__username'), target_type=F('content_type__model')
+        )),
+        ('archived_notifications', NotificationArchive.objects.filter(
+            recipient=user
+        ).order_by('id').values(
+            'id', 'actor_id', 'verb_code', 'content_type_id', 'object_id', 'timestamp'
+        )),
+    ]
+
+
+def _rows(queryset):
+    chunk_size = getattr(settings, 'ACCOUNT_EXPORT_CHUNK_SIZE', 2000)
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _encode(row):
+    return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_ndjson(user):
+    """Yield the export as NDJSON lines, each tagged with its section."""
+    for name, queryset in _sections(user):
+        for row in _rows(queryset):
+            yield _encode({'type': name, **row}).encode()
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable file that buffers whatever ZipFile writes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_zip(user):
+    """Yield the export as a zip archive with one NDJSON file per section."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, queryset in _sections(user):
+            with archive.open(f'{name}.ndjson', 'w') as entry:
+                for row in _rows(queryset):
+                    entry.write(_encode(row).encode())
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # Remaining compressed data and the central directory.
+    yield sink.drain()
@@ -0,0 +1,121 @@
+"""
+Profile picture thumbnails.
+
+After a new profile picture is committed, a background thread pool renders
+square thumbnails in every PROFILE_THUMBNAIL_SIZES size as WebP and JPEG and
+records their storage names in User.profile_thumbnails. Names are derived
+from a hash of the source image, so re-uploading the same picture reuses the
+files already stored and a changed picture never hits a stale cached URL.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from posts import conditional
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PROFILE_THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='profile-thumbnails'
+        )
+    return _executor
+
+
+def _digest(name):
+    sha = hashlib.sha256()
+    with default_storage.open(name, 'rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:20]
+
+
+def render_thumbnails(name):
+    """Store thumbnails of the image at ``name``; return {size: {format: name}}."""
+    digest = _digest(name)
+    sizes = getattr(settings, 'PROFILE_THUMBNAIL_SIZES', (48, 128))
+    largest = max(sizes)
+    with default_storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        # JPEGs can be decoded at a reduced scale close to the largest size.
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    thumbnails = {}
+    for size in sizes:
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        names = {}
+        for ext, pil_format in FORMATS.items():
+            target = f'profiles/thumbnails/{digest}-{size}.{ext}'
+            if not default_storage.exists(target):
+                buffer = BytesIO()
+                square.save(buffer, pil_format, quality=85)
+                default_storage.save(target, ContentFile(buffer.getvalue()))
+            names[ext] = target
+        thumbnails[str(size)] = names
+    return thumbnails
+
+
+def _generate(user_id, name):
+    try:
+        thumbnails = render_thumbnails(name)
+    except Exception:
+        logger.exception("Could not create thumbnails for %s", name)
+        return
+    # Skip if the user has uploaded another picture in the meantime.
+    updated = User.objects.filter(pk=user_id, profile_picture=name).update(
+        profile_thumbnails=thumbnails
+    )
+    if updated:
+        # Post payloads and expanded comment authors embed the thumbnails.
+        conditional.bump(conditional.POSTS, conditional.COMMENTS)
+
+
+def _generate_in_pool(user_id, name):
+    try:
+        _generate(user_id, name)
+    except Exception:
+        logger.exception("Could not save thumbnails for %s", name)
+    finally:
+        connections.close_all()
+
+
+def schedule_thumbnails(user):
+    """Render thumbnails for the user's current picture once it is committed."""
+    user_id, name = user.pk, user.profile_picture.name
+    if not name:
+        return
+    if getattr(settings, 'PROFILE_THUMBNAILS_ASYNC', True):
+        transaction.on_commit(
+            lambda: _get_executor().submit(_generate_in_pool, user_id, name)
+        )
+    else:
+        transaction.on_commit(lambda: _generate(user_id, name))
+
+
+def thumbnail_urls(thumbnails, request=None):
+    """Map stored thumbnail names to URLs, absolute when ``request`` is given."""
+    urls = {}
+    for size, names in (thumbnails or {}).items():
+        urls[size] = {}
+        for ext, name in names.items():
+            url = default_storage.url(name)
+            urls[size][ext] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Follow = User.followers.through
+
+    def counted(column):
+        return Coalesce(Subquery(
+            Follow.objects.filter(**{column: OuterRef('pk')}).values(column).annotate(
+                n=Count('id')
+            ).values('n')
+        ), 0)
+
+    User.objects.update(
+        follower_count=counted('from_user'),
+        following_count=counted('to_user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
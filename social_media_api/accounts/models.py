@@ -13,6 +13,11 @@ class User(AbstractUser):
         related_name='following',
         blank=True
     )
+    # Denormalized sizes of the follow graph, maintained by accounts.signals.
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # {size: {format: storage name}} for profile_picture, see accounts.images.
+    profile_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.username
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from social_media_api.fieldsets import SparseFieldsMixin
+from .images import schedule_thumbnails, thumbnail_urls
 from .models import User
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -30,12 +32,53 @@ class LoginSerializer(serializers.Serializer):
         return user
 
 
-class ProfileSerializer(serializers.ModelSerializer):
-    followers_count = serializers.SerializerMethodField()
+class AuthorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Public summary of a user, used when ?expand= asks for a nested author."""
+    profile_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ['username', 'bio', 'profile_picture', 'followers_count']
+        fields = ['id', 'username', 'bio', 'profile_thumbnails']
+        field_columns = {'profile_thumbnails': ('profile_thumbnails',)}
 
-    def get_followers_count(self, obj):
-        return obj.followers.count()
+    def get_profile_thumbnails(self, obj):
+        return thumbnail_urls(obj.profile_thumbnails, self.context.get('request'))
+
+
+class ProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    followers_count = serializers.IntegerField(source='follower_count', read_only=True)
+    profile_thumbnails = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = [
+            'username', 'bio', 'profile_picture', 'profile_thumbnails',
+            'followers_count', 'following_count'
+        ]
+        read_only_fields = ['username', 'following_count']
+        field_columns = {'profile_thumbnails': ('profile_thumbnails',)}
+
+    def get_profile_thumbnails(self, obj):
+        return thumbnail_urls(obj.profile_thumbnails, self.context.get('request'))
+
+    def update(self, instance, validated_data):
+        new_picture = 'profile_picture' in validated_data
+        if new_picture:
+            # Old thumbnails no longer match; new ones are rendered after commit.
+            validated_data['profile_thumbnails'] = {}
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Save only the edited columns so the follow counters, which are
+        # updated in place by accounts.signals, are never overwritten.
+        instance.save(update_fields=list(validated_data))
+        if new_picture:
+            schedule_thumbnails(instance)
+        return instance
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
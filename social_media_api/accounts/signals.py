@@ -0,0 +1,99 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import suggestions
+from .authentication import token_cache
+from .models import User
+
+Follow = User.followers.through
+
+
+def _bump(user_ids, field, delta):
+    User.objects.filter(pk__in=user_ids).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def _apply(instance, reverse, pk_set, delta):
+    # reverse=True: instance follows/unfollows the authors in pk_set.
+    # reverse=False: the followers in pk_set follow/unfollow instance.
+    if reverse:
+        _bump([instance.pk], 'following_count', delta * len(pk_set))
+        _bump(pk_set, 'follower_count', delta)
+    else:
+        _bump([instance.pk], 'follower_count', delta * len(pk_set))
+        _bump(pk_set, 'following_count', delta)
+
+
+@receiver(m2m_changed, sender=Follow)
+def update_follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    # These run inside the transaction Django opens for the M2M write, so the
+    # counters commit or roll back together with the through-table rows.
+    if action == 'post_add' and pk_set:
+        # Django only reports ids that were not already linked, so adding an
+        # existing follow again does not count twice.
+        _apply(instance, reverse, pk_set, 1)
+
+    elif action == 'pre_remove' and pk_set:
+        # pk_set holds every id passed to remove(), linked or not; only
+        # count the rows that are about to be deleted.
+        if reverse:
+            linked = Follow.objects.filter(to_user_id=instance.pk, from_user_id__in=pk_set)
+            linked = set(linked.values_list('from_user_id', flat=True))
+        else:
+            linked = Follow.objects.filter(from_user_id=instance.pk, to_user_id__in=pk_set)
+            linked = set(linked.values_list('to_user_id', flat=True))
+        if linked:
+            _apply(instance, reverse, linked, -1)
+
+    elif action == 'pre_clear':
+        if reverse:
+            linked = Follow.objects.filter(to_user_id=instance.pk).values('from_user_id')
+            _bump(linked, 'follower_count', -1)
+            User.objects.filter(pk=instance.pk).update(following_count=0)
+        else:
+            linked = Follow.objects.filter(from_user_id=instance.pk).values('to_user_id')
+            _bump(linked, 'following_count', -1)
+            User.objects.filter(pk=instance.pk).update(follower_count=0)
+
+
+@receiver(m2m_changed, sender=Follow)
+def update_suggestion_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        transaction.on_commit(suggestions.graph.invalidate)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    followed = action == 'post_add'
+    if reverse:
+        edges = [(instance.pk, list(pk_set))]
+    else:
+        edges = [(follower_id, [instance.pk]) for follower_id in pk_set]
+
+    for follower_id, author_ids in edges:
+        transaction.on_commit(
+            partial(suggestions.graph.record, follower_id, author_ids, followed)
+        )
+        transaction.on_commit(
+            partial(cache.delete, suggestions.cache_key(follower_id))
+        )
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    transaction.on_commit(partial(token_cache.discard, instance.key))
+
+
+@receiver(post_save, sender=User)
+def forget_saved_user_tokens(sender, instance, **kwargs):
+    # Deactivation and password changes go through save(); counter updates
+    # use queryset.update() and do not evict the cached user.
+    transaction.on_commit(partial(token_cache.discard_user, instance.pk))
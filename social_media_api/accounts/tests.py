@@ -1,3 +1,282 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import zipfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from posts.models import Comment, Like, Post
+from social_media_api.testing import client_for
+
+from . import suggestions
+from .authentication import token_cache
+from .models import User
+
+
+class FollowCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.client = client_for(self.alice)
+
+    def counts(self):
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        return self.alice.following_count, self.bob.follower_count
+
+    def test_refollowing_counts_once(self):
+        for action in ('follow', 'follow', 'unfollow', 'unfollow', 'follow'):
+            response = self.client.post(f'/api/accounts/{action}/{self.bob.pk}/')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_following_yourself_is_rejected(self):
+        response = self.client.post(f'/api/accounts/follow/{self.alice.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_profile_shows_current_counters(self):
+        # The first request caches the token's user; the counters must still
+        # reflect follows made after it.
+        self.client.get('/api/accounts/profile/')
+        client_for(self.bob).post(f'/api/accounts/follow/{self.alice.pk}/')
+        profile = self.client.get('/api/accounts/profile/').json()
+        self.assertEqual(profile['followers_count'], 1)
+
+
+class BulkFollowTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        self.client = client_for(self.alice)
+
+    def statuses(self, action, user_ids):
+        response = self.client.post(
+            f'/api/accounts/{action}/bulk/', {'user_ids': user_ids}, format='json'
+        )
+        return [(r['user_id'], r['status']) for r in response.json()['results']]
+
+    def test_bulk_follow_reports_each_id(self):
+        self.client.post(f'/api/accounts/follow/{self.bob.pk}/')
+        self.assertEqual(
+            self.statuses('follow', [self.bob.pk, self.carol.pk, self.carol.pk, self.alice.pk, 999999]),
+            [(self.bob.pk, 'already_following'), (self.carol.pk, 'followed'),
+             (self.alice.pk, 'self'), (999999, 'not_found')]
+        )
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 2)
+
+    def test_bulk_unfollow_reports_each_id(self):
+        self.client.post(f'/api/accounts/follow/{self.bob.pk}/')
+        self.assertEqual(
+            self.statuses('unfollow', [self.bob.pk, self.carol.pk]),
+            [(self.bob.pk, 'unfollowed'), (self.carol.pk, 'not_following')]
+        )
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.follower_count, 0)
+
+
+class SuggestionTests(TransactionTestCase):
+    # Rebuilds read the follow table from another thread and connection,
+    # which must see committed rows.
+    def setUp(self):
+        cache.clear()
+        suggestions.graph.invalidate()
+        self.users = {name: User.objects.create_user(name) for name in 'abcde'}
+
+    def follow(self, follower, *authors):
+        self.users[follower].following.add(*(self.users[name] for name in authors))
+
+    def names(self, ranked):
+        by_id = {user.pk: name for name, user in self.users.items()}
+        return [(by_id[pk], n) for pk, n in ranked]
+
+    def test_friends_of_friends_ranked_by_mutual_count(self):
+        self.follow('a', 'b', 'c')
+        self.follow('b', 'a', 'd', 'e')
+        self.follow('c', 'd')
+        response = client_for(self.users['a']).get('/api/accounts/suggestions/')
+        self.assertEqual(
+            [(s['username'], s['mutual_count']) for s in response.json()['results']],
+            [('d', 2), ('e', 1)]
+        )
+
+    def test_old_snapshot_is_served_while_one_rebuild_runs(self):
+        graph = suggestions.FollowGraph()
+        self.follow('a', 'b')
+        self.follow('b', 'c')
+        graph.suggest(self.users['a'].pk, 10)
+
+        # Written behind the graph's back, so only a rebuild sees it.
+        User.followers.through.objects.create(
+            to_user_id=self.users['b'].pk, from_user_id=self.users['d'].pk
+        )
+        with self.settings(SUGGESTIONS_SNAPSHOT_MAX_AGE=-1):
+            with graph._rebuild_lock:
+                # A rebuild is already running: serve the old snapshot.
+                self.assertEqual(self.names(graph.suggest(self.users['a'].pk, 10)), [('c', 1)])
+                self.assertIsNone(graph._rebuild_thread)
+
+            self.assertEqual(self.names(graph.suggest(self.users['a'].pk, 10)), [('c', 1)])
+            graph._rebuild_thread.join()
+        self.assertEqual(
+            self.names(graph.suggest(self.users['a'].pk, 10)), [('c', 1), ('d', 1)]
+        )
+
+    def test_follows_during_a_rebuild_are_kept(self):
+        graph = suggestions.FollowGraph()
+        read_edges = graph._read_edges
+
+        def read_then_follow():
+            csr = read_edges()
+            graph.record(self.users['b'].pk, [self.users['c'].pk], True)
+            return csr
+
+        self.follow('a', 'b')
+        graph._read_edges = read_then_follow
+        graph.rebuild()
+        self.assertEqual(self.names(graph.suggest(self.users['a'].pk, 10)), [('c', 1)])
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.client = client_for(self.alice)
+
+    def status(self):
+        return self.client.get('/api/accounts/profile/').status_code
+
+    def test_cached_user_skips_the_token_query(self):
+        self.status()
+        # Only the profile's own counter refresh.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.status(), 200)
+
+    def test_deleted_token_is_rejected(self):
+        self.status()
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(user=self.alice).delete()
+        self.assertEqual(self.status(), 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.status()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.is_active = False
+            self.alice.save()
+        self.assertEqual(self.status(), 401)
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        users = [User.objects.create_user(name) for name in 'abc']
+        for user in users:
+            token_cache.put(f'key-{user.username}', user)
+            token_cache.get('key-a')
+        self.assertIsNotNone(token_cache.get('key-a'))
+        self.assertIsNone(token_cache.get('key-b'))
+        self.assertIsNotNone(token_cache.get('key-c'))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.alice.following.add(self.bob)
+        mine = Post.objects.create(author=self.alice, title='mine', content='c')
+        theirs = Post.objects.create(author=self.bob, title='theirs', content='c')
+        Comment.objects.create(post=theirs, author=self.alice, content='hi')
+        Comment.objects.create(post=mine, author=self.bob, content='hello')
+        Like.objects.create(user=self.alice, post=theirs)
+        self.client = client_for(self.alice)
+
+    def export(self, output):
+        response = self.client.get(f'/api/accounts/export/?output={output}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_holds_only_the_users_own_data(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        by_type = {}
+        for row in rows:
+            by_type.setdefault(row.pop('type'), []).append(row)
+
+        self.assertEqual([row['username'] for row in by_type['profile']], ['alice'])
+        self.assertEqual([row['title'] for row in by_type['posts']], ['mine'])
+        self.assertEqual([row['content'] for row in by_type['comments']], ['hi'])
+        self.assertEqual(len(by_type['likes']), 1)
+        self.assertEqual([row['username'] for row in by_type['following']], ['bob'])
+        self.assertNotIn('followers', by_type)
+
+    def test_zip_has_one_file_per_section(self):
+        with zipfile.ZipFile(io.BytesIO(self.export('zip'))) as archive:
+            self.assertIn('profile.ndjson', archive.namelist())
+            posts = archive.read('posts.ndjson').decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in posts], ['mine'])
+
+    def test_unknown_output_is_rejected(self):
+        self.assertEqual(self.client.get('/api/accounts/export/?output=xml').status_code, 400)
+
+
+@override_settings(PROFILE_THUMBNAILS_ASYNC=False)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        storage = self.settings(MEDIA_ROOT=media.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.alice = User.objects.create_user('alice')
+        self.client = client_for(self.alice)
+
+    def upload(self, color):
+        image = io.BytesIO()
+        Image.new('RGB', (300, 200), color).save(image, 'PNG')
+        picture = SimpleUploadedFile('me.png', image.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                '/api/accounts/profile/', {'profile_picture': picture}, format='multipart'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.alice.refresh_from_db()
+        return self.alice.profile_thumbnails
+
+    def test_every_size_and_format_is_stored(self):
+        thumbnails = self.upload('red')
+        self.assertEqual(set(thumbnails), {'48', '128'})
+        for names in thumbnails.values():
+            self.assertEqual(set(names), {'webp', 'jpeg'})
+            for name in names.values():
+                self.assertTrue(default_storage.exists(name))
+        with default_storage.open(thumbnails['48']['jpeg']) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (48, 48))
+
+    def test_same_picture_reuses_its_files_and_a_new_one_does_not(self):
+        first = self.upload('red')
+        self.assertEqual(self.upload('red'), first)
+        self.assertNotEqual(self.upload('blue'), first)
+
+    def test_urls_are_absolute_on_profile_and_post_endpoints(self):
+        self.upload('red')
+        post = Post.objects.create(author=self.alice, title='t', content='c')
+        profile = self.client.get('/api/accounts/profile/').json()
+        detail = self.client.get(f'/api/posts/posts/{post.pk}/').json()
+
+        url = profile['profile_thumbnails']['48']['webp']
+        self.assertTrue(url.startswith('https://testserver/'))
+        self.assertTrue(profile['profile_picture'].startswith('https://testserver/'))
+        self.assertEqual(detail['author_thumbnails'], profile['profile_thumbnails'])
+
+    def test_new_thumbnails_change_the_post_etag(self):
+        post = Post.objects.create(author=self.alice, title='t', content='c')
+        url = f'/api/posts/posts/{post.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.upload('red')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['author_thumbnails'])
@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import RegisterView, LoginView, ProfileView
 from .views import FollowUserView, UnfollowUserView  
+from .views import BulkFollowView, BulkUnfollowView, SuggestionsView
+from .views import AccountExportView
 
 urlpatterns = [
     path('register/', RegisterView.as_view()),
@@ -8,5 +10,9 @@ urlpatterns = [
     path('profile/', ProfileView.as_view()),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
+    path('follow/bulk/', BulkFollowView.as_view(), name='bulk-follow'),
+    path('unfollow/bulk/', BulkUnfollowView.as_view(), name='bulk-unfollow'),
+    path('suggestions/', SuggestionsView.as_view(), name='suggestions'),
+    path('export/', AccountExportView.as_view(), name='account-export'),
 
 ]
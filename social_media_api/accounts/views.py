@@ -6,8 +6,15 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
 from .serializers import RegisterSerializer, LoginSerializer, ProfileSerializer
+from .serializers import BulkFollowSerializer
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from .models import User
+from .suggestions import suggestions_for
+from .export import export_ndjson, export_zip
+from django.http import StreamingHttpResponse
+from social_media_api.fieldsets import sparse_kwargs
 
 
 class RegisterView(APIView):
@@ -39,9 +46,35 @@ class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = ProfileSerializer(request.user)
+        # The authenticated user may come from the token cache.
+        request.user.refresh_from_db(
+            fields=['follower_count', 'following_count', 'profile_thumbnails']
+        )
+        serializer = ProfileSerializer(
+            request.user, context={'request': request}, **sparse_kwargs(request)
+        )
+        return Response(serializer.data)
+
+    def patch(self, request):
+        user = User.objects.get(pk=request.user.pk)
+        serializer = ProfileSerializer(
+            user, data=request.data, partial=True, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
         return Response(serializer.data)
 
+class SuggestionsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        return Response({'results': suggestions_for(request.user, limit)})
+
+
 class FollowUserView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -69,4 +102,88 @@ class UnfollowUserView(APIView):
         request.user.following.remove(target_user)
         return Response(
             {"detail": f"You unfollowed {target_user.username}."}
-        )
\ No newline at end of file
+        )
+
+
+class BulkFollowView(APIView):
+    """Follow many users at once, e.g. during onboarding."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data['user_ids']))
+
+        with transaction.atomic():
+            # One query both validates the ids and finds existing follows.
+            found = dict(User.objects.filter(pk__in=user_ids).annotate(
+                is_following=Exists(User.followers.through.objects.filter(
+                    from_user_id=OuterRef('pk'), to_user_id=request.user.pk
+                ))
+            ).values_list('pk', 'is_following'))
+
+            results = []
+            to_follow = []
+            for user_id in user_ids:
+                if user_id not in found:
+                    status = 'not_found'
+                elif user_id == request.user.pk:
+                    status = 'self'
+                elif found[user_id]:
+                    status = 'already_following'
+                else:
+                    status = 'followed'
+                    to_follow.append(user_id)
+                results.append({'user_id': user_id, 'status': status})
+
+            # add() inserts with bulk_create(ignore_conflicts=True) and sends
+            # m2m_changed, which keeps counters and timelines in step.
+            if to_follow:
+                request.user.following.add(*to_follow)
+
+        return Response({'results': results})
+
+
+class BulkUnfollowView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data['user_ids']))
+
+        with transaction.atomic():
+            following = set(User.followers.through.objects.filter(
+                to_user_id=request.user.pk, from_user_id__in=user_ids
+            ).values_list('from_user_id', flat=True))
+
+            if following:
+                request.user.following.remove(*following)
+
+        return Response({'results': [
+            {
+                'user_id': user_id,
+                'status': 'unfollowed' if user_id in following else 'not_following'
+            }
+            for user_id in user_ids
+        ]})
+
+
+class AccountExportView(APIView):
+    """Stream all of the user's own data as NDJSON, or as a zip with ?output=zip."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output == 'zip':
+            stream, content_type = export_zip(request.user), 'application/zip'
+        elif output == 'ndjson':
+            stream, content_type = export_ndjson(request.user), 'application/x-ndjson'
+        else:
+            return Response({"detail": "output must be 'ndjson' or 'zip'."}, status=400)
+
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{request.user.username}-export.{output}"'
+        )
+        return response
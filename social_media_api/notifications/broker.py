@@ -0,0 +1,136 @@
+"""
+Pub/sub broker for real-time notification delivery.
+
+Notification writes publish events keyed by recipient id; the SSE stream
+view subscribes one bounded queue per open connection. The default
+InMemoryBroker only reaches connections served by the same process. Set
+NOTIFICATION_BROKER_BACKEND to the dotted path of another BrokerBackend
+(Redis pub/sub, Postgres LISTEN/NOTIFY, ...) to fan out across workers.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One stream connection's bounded event queue."""
+
+    def __init__(self, recipient_id, maxsize):
+        self.recipient_id = recipient_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        # Set when an event had to be dropped because the client is not
+        # keeping up; the stream then asks the client to resync.
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue ``event`` from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The connection's event loop has already shut down.
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Return the next event, or None if ``timeout`` seconds pass first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BrokerBackend:
+    def subscribe(self, recipient_id):
+        """Return a Subscription receiving events published to recipient_id.
+
+        Must be called from the event loop serving the connection.
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def publish(self, recipient_id, event):
+        """Deliver ``event`` (a JSON-serializable dict with an 'id') to subscribers.
+
+        May be called from any thread.
+        """
+        raise NotImplementedError
+
+    def has_subscribers(self, recipient_id):
+        """Cheap check used to skip building events nobody will receive."""
+        return True
+
+
+class InMemoryBroker(BrokerBackend):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, recipient_id):
+        subscription = Subscription(
+            recipient_id,
+            getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+        )
+        with self._lock:
+            self._subscriptions[recipient_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.recipient_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.recipient_id]
+
+    def publish(self, recipient_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(recipient_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def has_subscribers(self, recipient_id):
+        return recipient_id in self._subscriptions
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(
+                    settings,
+                    'NOTIFICATION_BROKER_BACKEND',
+                    'notifications.broker.InMemoryBroker'
+                )
+                _broker = import_string(backend)()
+    return _broker
+
+
+def publish_notification(recipient_id, notification_id):
+    """Publish the current state of a notification to its recipient's streams."""
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    broker = get_broker()
+    if not broker.has_subscribers(recipient_id):
+        return
+    notification = Notification.objects.select_related('actor').filter(
+        pk=notification_id
+    ).first()
+    if notification is not None:
+        broker.publish(recipient_id, dict(NotificationSerializer(notification).data))
@@ -0,0 +1,35 @@
+"""
+Cached unread-notification counts for inbox badges.
+
+The count is read from the partial unread index and cached per recipient
+for NOTIFICATION_UNREAD_CACHE_TTL seconds (None disables caching). Anything
+that creates notifications or changes their read state must call
+invalidate_unread_count() for the affected recipients.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification
+
+
+def _key(recipient_id):
+    return f'notifications:unread:{recipient_id}'
+
+
+def unread_count(recipient_id):
+    ttl = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TTL', None)
+    if ttl is not None:
+        cached = cache.get(_key(recipient_id))
+        if cached is not None:
+            return cached
+
+    count = Notification.objects.filter(recipient_id=recipient_id, is_read=False).count()
+    if ttl is not None:
+        cache.set(_key(recipient_id), count, ttl)
+    return count
+
+
+def invalidate_unread_count(*recipient_ids):
+    keys = [_key(recipient_id) for recipient_id in recipient_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
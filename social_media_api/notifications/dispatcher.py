@@ -0,0 +1,136 @@
+"""
+Background, coalescing notification writer.
+
+Views hand events to ``dispatcher.notify()`` and return immediately. Events
+are buffered in memory and written by a worker thread every
+NOTIFICATION_FLUSH_INTERVAL seconds. Events for the same (recipient, verb,
+target) are folded into a single row: into each other while buffered, and
+into an unread notification for the same key written within the last
+NOTIFICATION_COALESCE_WINDOW seconds, so a viral post produces
+"alice and 41 others liked your post" rather than 42 rows. An actor already
+notified for the same key within the window (say, liking a post again after
+unliking it) is neither counted again nor re-notified.
+
+A failed write is logged and does not affect the rest of the batch. Events
+still buffered when the process exits are flushed by an atexit hook.
+
+Set NOTIFICATIONS_ASYNC = False to write each event inline instead.
+"""
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .broker import publish_notification
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flush_scheduled = False
+        self._executor = None
+
+    def notify(self, recipient_id, actor_id, verb, target=None):
+        if recipient_id == actor_id:
+            return
+
+        if target is not None:
+            content_type_id = ContentType.objects.get_for_model(target).pk
+            object_id = target.pk
+        else:
+            content_type_id = object_id = None
+        key = (recipient_id, verb, content_type_id, object_id)
+
+        if not getattr(settings, 'NOTIFICATIONS_ASYNC', True):
+            self._write(key, [actor_id])
+            return
+
+        with self._lock:
+            self._pending.setdefault(key, []).append(actor_id)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='notifications'
+                )
+                atexit.register(self.flush)
+        self._executor.submit(self._flush_later)
+
+    def _flush_later(self):
+        time.sleep(getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 2))
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """Write every buffered event now."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        for key, actor_ids in batch.items():
+            try:
+                self._write(key, actor_ids)
+            except Exception:
+                logger.exception("Could not write notification for %r", key)
+
+    def _write(self, key, actor_ids):
+        recipient_id, verb, content_type_id, object_id = key
+        # Keep each actor once, ordered by their latest event.
+        actor_ids = list(reversed(dict.fromkeys(reversed(actor_ids))))
+        now = timezone.now()
+        window = getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 300)
+
+        with transaction.atomic():
+            recent = list(Notification.objects.select_for_update().filter(
+                recipient_id=recipient_id,
+                verb=verb,
+                content_type_id=content_type_id,
+                object_id=object_id,
+                timestamp__gte=now - timedelta(seconds=window)
+            ).order_by('-timestamp').values('id', 'is_read', 'actor_ids'))
+
+            notified = {actor_id for row in recent for actor_id in row['actor_ids']}
+            actor_ids = [actor_id for actor_id in actor_ids if actor_id not in notified]
+            if not actor_ids:
+                return
+
+            existing = next((row for row in recent if not row['is_read']), None)
+            if existing is not None:
+                Notification.objects.filter(pk=existing['id']).update(
+                    actor_id=actor_ids[-1],
+                    actor_count=F('actor_count') + len(actor_ids),
+                    actor_ids=existing['actor_ids'] + actor_ids,
+                    timestamp=now
+                )
+                # update() sends no post_save, so publish the change here.
+                transaction.on_commit(
+                    partial(publish_notification, recipient_id, existing['id'])
+                )
+            else:
+                Notification.objects.create(
+                    recipient_id=recipient_id,
+                    actor_id=actor_ids[-1],
+                    actor_count=len(actor_ids),
+                    actor_ids=actor_ids,
+                    verb=verb,
+                    content_type_id=content_type_id,
+                    object_id=object_id
+                )
+
+
+dispatcher = NotificationDispatcher()
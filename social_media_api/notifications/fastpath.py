@@ -0,0 +1,19 @@
+"""
+Serializer-free rendering of inbox pages; see social_media_api.fastpath.
+
+render_notification mirrors NotificationSerializer field for field.
+"""
+from social_media_api.fastpath import RowRenderer, format_datetime
+
+from .models import describe
+
+render_notification = RowRenderer(
+    ('id', 'id'),
+    ('actor', 'actor__username'),
+    ('verb', 'verb'),
+    ('actor_count', 'actor_count'),
+    ('description', None,
+     lambda row: describe(row['actor__username'], row['verb'], row['actor_count'])),
+    ('is_read', 'is_read'),
+    ('timestamp', 'timestamp', format_datetime),
+)
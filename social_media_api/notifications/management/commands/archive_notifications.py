@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.retention import archive_read_notifications
+
+
+class Command(BaseCommand):
+    help = "Move old read notifications out of the inbox table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+            help="Archive read notifications older than this many days."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Rows moved per transaction."
+        )
+        parser.add_argument(
+            '--to-file', metavar='PATH',
+            help="Append to this gzipped NDJSON file instead of the archive table."
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help="Seconds to sleep between batches."
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_read_notifications(
+            options['days'],
+            batch_size=options['batch_size'],
+            path=options['to_file'],
+            pause=options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} notifications."))
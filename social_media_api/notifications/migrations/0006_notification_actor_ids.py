@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:52
+
+from django.db import migrations, models
+
+
+def record_latest_actor(apps, schema_editor):
+    # Earlier actors of merged rows were never stored; only the latest is known.
+    Notification = apps.get_model('notifications', 'Notification')
+    batch = []
+    for notification in Notification.objects.only('id', 'actor_id').iterator():
+        notification.actor_ids = [notification.actor_id]
+        batch.append(notification)
+        if len(batch) >= 500:
+            Notification.objects.bulk_update(batch, ['actor_ids'])
+            batch = []
+    Notification.objects.bulk_update(batch, ['actor_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notificationarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(record_latest_actor, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,20 @@ from django.contrib.contenttypes.models import ContentType
 
 User = settings.AUTH_USER_MODEL
 
+# Compact codes for verbs kept in NotificationArchive; anything else is 0.
+VERB_CODES = {
+    'liked your post': 1,
+}
+
+
+def describe(actor, verb, actor_count):
+    others = actor_count - 1
+    if others <= 0:
+        return f"{actor} {verb}"
+    noun = 'other' if others == 1 else 'others'
+    return f"{actor} and {others} {noun} {verb}"
+
+
 class Notification(models.Model):
     recipient = models.ForeignKey(
         User,
@@ -30,8 +44,51 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     target = GenericForeignKey('content_type', 'object_id')
 
+    # Number of actors folded into this notification by the dispatcher;
+    # `actor` is the most recent of them.
+    actor_count = models.PositiveIntegerField(default=1)
+    # Ids of the actors counted in actor_count, so a repeated event from the
+    # same actor is not counted twice.
+    actor_ids = models.JSONField(default=list, blank=True, editable=False)
+
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['recipient', '-timestamp', '-id'],
+                name='notif_recipient_time_idx'
+            ),
+            # Serves unread badges and the unread_only inbox filter.
+            models.Index(
+                fields=['recipient', '-timestamp', '-id'],
+                condition=models.Q(is_read=False),
+                name='notif_recipient_unread_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.description
+
+    @property
+    def description(self):
+        return describe(self.actor, self.verb, self.actor_count)
+
+
+class NotificationArchive(models.Model):
+    """Compact record of a read notification removed from the inbox."""
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications'
+    )
+    actor_id = models.BigIntegerField()
+    verb_code = models.PositiveSmallIntegerField()
+    content_type_id = models.PositiveIntegerField(null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    timestamp = models.DateTimeField()
+
     def __str__(self):
-        return f"{self.actor} {self.verb}"
+        return f"Archived notification {self.id}"
@@ -0,0 +1,111 @@
+"""
+Retention for the notification inbox.
+
+Read notifications older than a cutoff are moved out of Notification either
+into NotificationArchive (ids, verb code and timestamp only) or into a
+gzipped NDJSON file. Rows are moved in bounded batches, one short
+transaction per batch, so the job never holds SQLite's write lock for long.
+"""
+import gzip
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import VERB_CODES, Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('id', 'recipient_id', 'actor_id', 'verb', 'content_type_id', 'object_id', 'timestamp')
+
+
+def archive_read_notifications(days, batch_size=500, path=None, pause=0.0):
+    """
+    Archive read notifications older than ``days`` days.
+
+    With ``path`` rows are appended to that gzipped NDJSON file instead of
+    the archive table. Returns the number of notifications archived.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    stale = Notification.objects.filter(is_read=True, timestamp__lt=cutoff)
+    out = gzip.open(path, 'at', encoding='utf-8') if path else None
+    archived = 0
+
+    try:
+        while True:
+            with transaction.atomic():
+                rows = list(stale.order_by('id').values(*FIELDS)[:batch_size])
+                if not rows:
+                    break
+
+                if out:
+                    for row in rows:
+                        row['timestamp'] = row['timestamp'].isoformat()
+                        out.write(json.dumps(row) + '\n')
+                    out.flush()
+                else:
+                    NotificationArchive.objects.bulk_create([
+                        NotificationArchive(
+                            id=row['id'],
+                            recipient_id=row['recipient_id'],
+                            actor_id=row['actor_id'],
+                            verb_code=VERB_CODES.get(row['verb'], 0),
+                            content_type_id=row['content_type_id'],
+                            object_id=row['object_id'],
+                            timestamp=row['timestamp'],
+                        )
+                        for row in rows
+                    ], ignore_conflicts=True)
+
+                Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+
+            archived += len(rows)
+            if len(rows) < batch_size:
+                break
+            if pause:
+                # Give other writers a turn at the database lock.
+                time.sleep(pause)
+    finally:
+        if out:
+            out.close()
+
+    return archived
+
+
+def _run_periodically(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            archived = archive_read_notifications(
+                settings.NOTIFICATION_RETENTION_DAYS,
+                pause=0.05
+            )
+            if archived:
+                logger.info("Archived %d read notifications", archived)
+        except Exception:
+            logger.exception("Notification retention run failed")
+        finally:
+            connections.close_all()
+
+
+_started = False
+
+
+def start_periodic_retention():
+    """Run the archiver every NOTIFICATION_RETENTION_INTERVAL seconds, if set."""
+    global _started
+    interval = getattr(settings, 'NOTIFICATION_RETENTION_INTERVAL', None)
+    if not interval or _started:
+        return
+    _started = True
+    threading.Thread(
+        target=_run_periodically,
+        args=(interval,),
+        name='notification-retention',
+        daemon=True
+    ).start()
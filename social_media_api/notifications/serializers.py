@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from accounts.serializers import AuthorSerializer
+from social_media_api.fieldsets import SparseFieldsMixin
 from .models import Notification
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     actor = serializers.ReadOnlyField(source='actor.username')
+    description = serializers.ReadOnlyField()
 
     class Meta:
         model = Notification
@@ -10,6 +13,45 @@ class NotificationSerializer(serializers.ModelSerializer):
             'id',
             'actor',
             'verb',
+            'actor_count',
+            'description',
             'is_read',
             'timestamp'
         ]
+        expandable_fields = {
+            'actor': lambda: AuthorSerializer(read_only=True),
+        }
+        field_columns = {'description': ('actor__username', 'verb', 'actor_count')}
+
+
+class NotificationSelectionSerializer(serializers.Serializer):
+    """Selects a subset of the caller's inbox for bulk operations."""
+    all = serializers.BooleanField(required=False)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=1000
+    )
+    until_id = serializers.IntegerField(required=False, min_value=1)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        chosen = [name for name in ('ids', 'until_id', 'until') if name in data]
+        if data.get('all'):
+            chosen.append('all')
+        if len(chosen) != 1:
+            raise serializers.ValidationError(
+                "Provide exactly one of 'all', 'ids', 'until_id' or 'until'."
+            )
+        return data
+
+    def filter(self, queryset):
+        data = self.validated_data
+        if 'ids' in data:
+            return queryset.filter(pk__in=data['ids'])
+        if 'until_id' in data:
+            return queryset.filter(pk__lte=data['until_id'])
+        if 'until' in data:
+            return queryset.filter(timestamp__lte=data['until'])
+        return queryset
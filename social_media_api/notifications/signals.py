@@ -0,0 +1,23 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .broker import publish_notification
+from .counters import invalidate_unread_count
+from .models import Notification
+
+
+# Deliberately no post_delete receiver: it would stop Django from deleting
+# notifications with a single DELETE. Bulk deletes invalidate explicitly.
+@receiver(post_save, sender=Notification)
+def drop_cached_unread_count(sender, instance, **kwargs):
+    invalidate_unread_count(instance.recipient_id)
+
+
+@receiver(post_save, sender=Notification)
+def push_to_streams(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(publish_notification, instance.recipient_id, instance.pk)
+    )
@@ -1,3 +1,262 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Post
+from social_media_api.testing import client_for
+
+from . import views
+from .dispatcher import NotificationDispatcher, dispatcher
+from .models import VERB_CODES, Notification, NotificationArchive
+from .retention import archive_read_notifications
+
+User = get_user_model()
+
+LIKED = 'liked your post'
+
+
+class InboxPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.notifications = [
+            Notification.objects.create(recipient=self.alice, actor=self.bob, verb=LIKED)
+            for _ in range(5)
+        ]
+        self.client = client_for(self.alice)
+
+    def ids(self, page):
+        return [notification['id'] for notification in page['results']]
+
+    def test_cursors_walk_the_inbox_both_ways(self):
+        first = self.client.get('/api/notifications/?page_size=3').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            self.ids(first) + self.ids(second),
+            [notification.pk for notification in reversed(self.notifications)]
+        )
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.ids(self.client.get(second['previous']).json()), self.ids(first))
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class DispatcherMergeTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        self.post = Post.objects.create(author=self.alice, title='t', content='c')
+
+    def like(self, user, post=None):
+        dispatcher.notify(self.alice.pk, user.pk, LIKED, post or self.post)
+
+    def test_likes_on_one_post_merge(self):
+        self.like(self.bob)
+        self.like(self.carol)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.carol)
+        self.assertEqual(notification.description, 'carol and 1 other liked your post')
+
+    def test_repeat_actor_is_counted_once(self):
+        # Like, unlike and like again, then someone else likes.
+        self.like(self.bob)
+        self.like(self.bob)
+        self.like(self.carol)
+        self.like(self.bob)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(sorted(notification.actor_ids), [self.bob.pk, self.carol.pk])
+
+    def test_repeat_actor_is_not_renotified_after_read(self):
+        self.like(self.bob)
+        Notification.objects.update(is_read=True)
+        self.like(self.bob)
+        self.assertEqual(Notification.objects.count(), 1)
+
+        self.like(self.carol)
+        self.assertEqual(
+            list(Notification.objects.order_by('id').values_list('is_read', 'actor_count')),
+            [(True, 1), (False, 1)]
+        )
+
+    def test_different_posts_do_not_merge(self):
+        other = Post.objects.create(author=self.alice, title='other', content='c')
+        self.like(self.bob)
+        self.like(self.bob, other)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_self_likes_are_ignored(self):
+        self.like(self.alice)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_failed_write_does_not_drop_the_batch(self):
+        batch = NotificationDispatcher()
+        batch._pending = {
+            (self.alice.pk, LIKED, None, None): ['not an id'],
+            (self.bob.pk, LIKED, None, None): [self.carol.pk],
+        }
+        with self.assertLogs('notifications.dispatcher', 'ERROR'):
+            batch.flush()
+        self.assertEqual(
+            list(Notification.objects.values_list('recipient_id', flat=True)), [self.bob.pk]
+        )
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.posts = [
+            Post.objects.create(author=self.alice, title=str(i), content='c') for i in range(3)
+        ]
+        self.client = client_for(self.alice)
+
+    def unread(self):
+        return self.client.get('/api/notifications/unread-count/').json()['unread']
+
+    def test_count_follows_new_and_read_notifications(self):
+        self.assertEqual(self.unread(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in self.posts:
+                client_for(self.bob).put(f'/api/posts/posts/{post.pk}/like/')
+        self.assertEqual(self.unread(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/mark-read/', {'all': True}, format='json')
+        self.assertEqual(self.unread(), 0)
+
+    def test_unread_only_filter(self):
+        for post in self.posts:
+            dispatcher.notify(self.alice.pk, self.bob.pk, LIKED, post)
+        Notification.objects.filter(object_id=self.posts[0].pk).update(is_read=True)
+        response = self.client.get('/api/notifications/?unread_only=true')
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class BulkSelectionTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.mine = [
+            Notification.objects.create(recipient=self.alice, actor=self.bob, verb=LIKED)
+            for _ in range(4)
+        ]
+        self.theirs = Notification.objects.create(recipient=self.bob, actor=self.alice, verb=LIKED)
+        self.client = client_for(self.alice)
+
+    def send(self, action, selection):
+        return self.client.post(f'/api/notifications/{action}/', selection, format='json')
+
+    def read_ids(self):
+        return set(Notification.objects.filter(is_read=True).values_list('pk', flat=True))
+
+    def test_mark_read_by_ids(self):
+        response = self.send('mark-read', {'ids': [self.mine[0].pk, self.theirs.pk]})
+        self.assertEqual(response.json(), {'updated': 1})
+        self.assertEqual(self.read_ids(), {self.mine[0].pk})
+
+    def test_mark_read_until_id(self):
+        self.send('mark-read', {'until_id': self.mine[1].pk})
+        self.assertEqual(self.read_ids(), {self.mine[0].pk, self.mine[1].pk})
+
+    def test_mark_read_until_time(self):
+        Notification.objects.filter(pk=self.mine[0].pk).update(
+            timestamp=self.mine[0].timestamp - timedelta(days=1)
+        )
+        self.send('mark-read', {'until': (self.mine[0].timestamp - timedelta(hours=1)).isoformat()})
+        self.assertEqual(self.read_ids(), {self.mine[0].pk})
+
+    def test_delete_all_keeps_other_inboxes(self):
+        self.assertEqual(self.send('delete', {'all': True}).json(), {'deleted': 4})
+        self.assertEqual(list(Notification.objects.all()), [self.theirs])
+
+    def test_exactly_one_selector(self):
+        for selection in ({}, {'all': True, 'ids': [self.mine[0].pk]}, {'all': False}):
+            self.assertEqual(self.send('delete', selection).status_code, 400)
+        self.assertEqual(Notification.objects.count(), 5)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        old = timezone.now() - timedelta(days=40)
+        self.notifications = {}
+        for name, is_read, timestamp in (
+            ('old_read', True, old), ('old_unread', False, old), ('new_read', True, None),
+        ):
+            notification = Notification.objects.create(
+                recipient=alice, actor=bob, verb=LIKED, is_read=is_read
+            )
+            if timestamp:
+                Notification.objects.filter(pk=notification.pk).update(timestamp=timestamp)
+            self.notifications[name] = notification.pk
+
+    def remaining(self):
+        by_id = {pk: name for name, pk in self.notifications.items()}
+        return {by_id[pk] for pk in Notification.objects.values_list('pk', flat=True)}
+
+    def test_old_read_notifications_move_to_the_archive(self):
+        self.assertEqual(archive_read_notifications(30, batch_size=1), 1)
+        self.assertEqual(self.remaining(), {'old_unread', 'new_read'})
+        archived = NotificationArchive.objects.get()
+        self.assertEqual((archived.pk, archived.verb_code),
+                         (self.notifications['old_read'], VERB_CODES[LIKED]))
+
+    def test_archive_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.ndjson.gz')
+            call_command('archive_notifications', days=30, to_file=path, stdout=io.StringIO())
+            with gzip.open(path, 'rt', encoding='utf-8') as archive:
+                rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['id'] for row in rows], [self.notifications['old_read']])
+        self.assertFalse(NotificationArchive.objects.exists())
+        self.assertEqual(self.remaining(), {'old_unread', 'new_read'})
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, NOTIFICATION_STREAM_MAX_AGE=0)
+class StreamReplayTests(TransactionTestCase):
+    # The stream reads through sync_to_async on another thread and connection,
+    # which must see committed rows.
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        self.posts = [
+            Post.objects.create(author=self.alice, title=str(i), content='c') for i in range(2)
+        ]
+
+    def replay(self, last_event_id):
+        async def read():
+            return [chunk async for chunk in views._event_stream(self.alice.pk, last_event_id)]
+        lines = ''.join(asyncio.run(read())).splitlines()
+        return [line for line in lines if line.startswith(('id: ', 'event: resync'))]
+
+    def test_merge_is_replayed_after_a_newer_event(self):
+        for post in self.posts:
+            dispatcher.notify(self.alice.pk, self.bob.pk, LIKED, post)
+        last = self.replay('1970-01-01T00:00:00Z|0')[-1][len('id: '):]
+
+        # Merged into the older notification while the client was away.
+        dispatcher.notify(self.alice.pk, self.carol.pk, LIKED, self.posts[0])
+        missed = self.replay(last)
+        self.assertEqual(len(missed), 1)
+        self.assertTrue(missed[0].endswith(f'|{Notification.objects.order_by("id").first().pk}'))
+
+    def test_nothing_is_replayed_when_up_to_date(self):
+        dispatcher.notify(self.alice.pk, self.bob.pk, LIKED, self.posts[0])
+        last = self.replay('1970-01-01T00:00:00Z|0')[-1][len('id: '):]
+        self.assertEqual(self.replay(last), [])
+
+    def test_unknown_event_id_asks_for_resync(self):
+        self.assertEqual(self.replay('12'), ['event: resync'])
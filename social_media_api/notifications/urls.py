@@ -1,6 +1,11 @@
 from django.urls import path
-from .views import NotificationListView
+from .views import NotificationListView, UnreadCountView
+from .views import MarkReadView, BulkDeleteView, notification_stream
 
 urlpatterns = [
     path('', NotificationListView.as_view()),
+    path('unread-count/', UnreadCountView.as_view(), name='unread-count'),
+    path('mark-read/', MarkReadView.as_view(), name='mark-read'),
+    path('delete/', BulkDeleteView.as_view(), name='bulk-delete'),
+    path('stream/', notification_stream, name='notification-stream'),
 ]
@@ -4,15 +4,210 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+import asyncio
+import json
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, NotificationSelectionSerializer
+from .counters import invalidate_unread_count, unread_count
+from .broker import get_broker
+from .fastpath import render_notification
+from social_media_api.fastpath import fast_path_enabled
+from social_media_api.fieldsets import narrow_queryset, sparse_kwargs
+from social_media_api.pagination import KeysetPagination
+
+class NotificationPagination(KeysetPagination):
+    cursor_fields = ('timestamp', 'id')
+
 
 class NotificationListView(APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get(self, request):
-        notifications = request.user.notifications.order_by(
-            '-timestamp'
+        notifications = request.user.notifications.select_related('actor')
+        if request.query_params.get('unread_only', '').lower() in ('1', 'true', 'yes'):
+            notifications = notifications.filter(is_read=False)
+
+        paginator = self.pagination_class()
+        if fast_path_enabled(request):
+            rows = paginator.paginate_queryset(
+                notifications.values(*render_notification.columns), request, view=self
+            )
+            return paginator.get_paginated_response(
+                [render_notification(row) for row in rows]
+            )
+
+        sparse = sparse_kwargs(request)
+        notifications = narrow_queryset(
+            # The related manager sets notification.recipient from recipient_id.
+            notifications, NotificationSerializer(**sparse),
+            required=('recipient', 'timestamp')
+        )
+        notifications = paginator.paginate_queryset(
+            notifications, request, view=self
         )
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+        serializer = NotificationSerializer(notifications, many=True, **sparse)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class UnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread': unread_count(request.user.pk)})
+
+
+class MarkReadView(APIView):
+    """Mark a selection of the inbox read with a single UPDATE."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        selection = NotificationSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+        updated = selection.filter(
+            Notification.objects.filter(recipient=request.user, is_read=False)
+        ).update(is_read=True)
+        if updated:
+            invalidate_unread_count(request.user.pk)
+        return Response({'updated': updated})
+
+
+class BulkDeleteView(APIView):
+    """Delete a selection of the inbox with a single DELETE."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        selection = NotificationSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+        deleted, _ = selection.filter(
+            Notification.objects.filter(recipient=request.user)
+        ).delete()
+        if deleted:
+            invalidate_unread_count(request.user.pk)
+        return Response({'deleted': deleted})
+
+
+def _stream_user(request):
+    # Reuse the API's configured authentication classes.
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+def _missed_events(recipient_id, position, limit):
+    timestamp, last_id = position
+    notifications = Notification.objects.filter(
+        Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=last_id),
+        recipient_id=recipient_id
+    ).select_related('actor').order_by('timestamp', 'pk')[:limit]
+    return [dict(NotificationSerializer(n).data) for n in notifications]
+
+
+# Event ids are (timestamp, id) rather than the notification id: a merge
+# republishes an older notification with a fresh timestamp, so only the
+# pair keeps increasing.
+def _event_id(event):
+    return f"{event['timestamp']}|{event['id']}"
+
+
+def _parse_event_id(value):
+    timestamp, _, pk = value.rpartition('|')
+    try:
+        timestamp, pk = parse_datetime(timestamp), int(pk)
+    except ValueError:
+        return None
+    return (timestamp, pk) if timestamp is not None else None
+
+
+def _sse(event):
+    return f"id: {_event_id(event)}\nevent: notification\ndata: {json.dumps(event)}\n\n"
+
+
+RESYNC = 'event: resync\ndata: {}\n\n'
+
+
+async def _event_stream(recipient_id, last_event_id):
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+    max_age = getattr(settings, 'NOTIFICATION_STREAM_MAX_AGE', 300)
+    replay_limit = getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+
+    broker = get_broker()
+    # Subscribe before replaying so nothing published meanwhile is lost.
+    subscription = broker.subscribe(recipient_id)
+    try:
+        yield 'retry: 3000\n\n'
+
+        if last_event_id:
+            position = _parse_event_id(last_event_id)
+            if position is None:
+                # Not an id this stream issued; refetch the inbox over HTTP.
+                yield RESYNC
+                return
+            missed = await sync_to_async(_missed_events)(
+                recipient_id, position, replay_limit
+            )
+            for event in missed:
+                yield _sse(event)
+            if len(missed) == replay_limit:
+                # Too far behind to replay; refetch the inbox over HTTP.
+                yield RESYNC
+                return
+
+        loop = asyncio.get_running_loop()
+        # Connections are recycled periodically; EventSource reconnects
+        # with Last-Event-ID and resumes where it left off.
+        deadline = loop.time() + max_age
+        while loop.time() < deadline:
+            event = await subscription.get(timeout=heartbeat)
+            if subscription.overflowed:
+                # The client fell behind and events were dropped.
+                yield RESYNC
+                return
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield _sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def notification_stream(request):
+    """Server-Sent Events stream of the caller's new notifications (ASGI only)."""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "The notification stream requires an ASGI server."},
+            status=501
+        )
+
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=401
+        )
+
+    last_event_id = (
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    )
+    response = StreamingHttpResponse(
+        _event_stream(user.pk, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
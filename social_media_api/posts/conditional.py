@@ -0,0 +1,55 @@
+"""
+Conditional GET (ETag) for post and comment endpoints.
+
+Detail views derive their ETag from a few columns fetched with one narrow
+query, so a matching If-None-Match is answered with 304 before the object
+is loaded or serialized. List views use a collection version stamp kept in
+the Django cache and bumped after every committed write to that collection;
+use a shared cache backend when running several workers. No endpoint sends
+Last-Modified: it has whole-second resolution, so If-Modified-Since would
+answer 304 for a write landing in the same second as the cached copy.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+
+POSTS = 'posts'
+COMMENTS = 'comments'
+
+
+def _version_key(name):
+    return f'posts:collection-version:{name}'
+
+
+def collection_version(name):
+    """Return the current version stamp (a float timestamp) of a collection."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(*names):
+    now = time.time()
+    cache.set_many({_version_key(name): now for name in names}, None)
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def respond(request, etag, render):
+    """
+    Return 304 if the request's If-None-Match matches ``etag``, otherwise
+    call ``render()`` and attach the ETag header to its response.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render()
+        if response.status_code == 200:
+            response['ETag'] = etag
+    return response
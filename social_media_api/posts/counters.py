@@ -0,0 +1,41 @@
+"""
+Denormalized like/comment counters on Post.
+
+Counters are adjusted with a single UPDATE using F() expressions so
+concurrent requests never overwrite each other's increments. Call these
+inside the same transaction as the row insert or delete they account for.
+Increments fold the activity into the post's trending score and decrements
+given the removed rows' creation times fold it back out; every adjustment
+stamps last_activity_at and bumps the post collection version.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+
+from . import conditional, trending
+from .models import Post
+
+
+def _adjust(post_id, field, delta, weight, removed):
+    changes = {field: Greatest(F(field) + delta, 0), 'last_activity_at': Now()}
+    if delta > 0:
+        changes['trending_score'] = trending.bump(weight * delta)
+    elif removed:
+        changes['trending_score'] = trending.unbump(weight, removed)
+    Post.objects.filter(pk=post_id).update(**changes)
+    transaction.on_commit(lambda: conditional.bump(conditional.POSTS))
+
+
+def adjust_likes(post_id, delta, removed=()):
+    """``removed`` holds the created_at of each like deleted by a decrement."""
+    _adjust(post_id, 'like_count', delta, trending.LIKE_WEIGHT, removed)
+
+
+def adjust_comments(post_id, delta, removed=()):
+    """``removed`` holds the created_at of each comment deleted by a decrement."""
+    _adjust(post_id, 'comment_count', delta, trending.COMMENT_WEIGHT, removed)
+
+
+def mark_activity(post_id):
+    """Record activity that does not change a counter, such as a comment edit."""
+    Post.objects.filter(pk=post_id).update(last_activity_at=Now())
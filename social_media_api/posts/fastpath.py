@@ -0,0 +1,66 @@
+"""
+Serializer-free rendering of feed pages; see social_media_api.fastpath.
+
+The renderers mirror PostSerializer (with its comment preview) and
+CommentSerializer field for field.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from accounts.images import thumbnail_urls
+from social_media_api.fastpath import RowRenderer, format_datetime
+
+from .models import Post, comment_preview_queryset
+
+render_comment = RowRenderer(
+    ('id', 'id'),
+    ('post', 'post_id'),
+    ('parent', 'parent_id'),
+    ('depth', 'depth'),
+    ('author', 'author__username'),
+    ('content', 'content'),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+)
+
+render_post = RowRenderer(
+    ('id', 'id'),
+    ('author', 'author__username'),
+    ('author_thumbnails', None, itemgetter('author_thumbnails')),
+    ('title', 'title'),
+    ('content', 'content'),
+    ('comments', None, itemgetter('comments')),
+    ('like_count', 'like_count'),
+    ('comment_count', 'comment_count'),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+    requires=('author__profile_thumbnails',),
+)
+
+
+def render_posts(post_ids, preview_size, request=None):
+    """
+    Render posts in ``post_ids`` order with their latest comments embedded;
+    thumbnail URLs are absolute when ``request`` is given.
+    """
+    rows = {
+        row['id']: row
+        for row in Post.objects.filter(pk__in=post_ids).values(*render_post.columns)
+    }
+    comments = defaultdict(list)
+    previews = comment_preview_queryset(preview_size).filter(
+        post_id__in=post_ids
+    ).values(*render_comment.columns)
+    for row in previews:
+        comments[row['post_id']].append(render_comment(row))
+
+    rendered = []
+    for post_id in post_ids:
+        row = rows.get(post_id)
+        if row is not None:
+            row['author_thumbnails'] = thumbnail_urls(
+                row['author__profile_thumbnails'], request
+            )
+            row['comments'] = comments[post_id]
+            rendered.append(render_post(row))
+    return rendered
@@ -0,0 +1,269 @@
+"""
+Bulk import of posts and comments from NDJSON.
+
+Each line is one JSON object:
+
+    {"type": "post", "ref": "src-1", "author": "alice", "title": "...",
+     "content": "...", "created_at": "2024-05-01T12:00:00Z"}
+    {"type": "comment", "post_ref": "src-1", "author": "bob", "content": "..."}
+
+Comments name their post either by the ``ref`` of a post imported earlier in
+the same run (``post_ref``) or by an existing post id (``post``). Authors are
+resolved by username through a map loaded once up front. Lines are read as a
+stream and written in chunks, one transaction per chunk; invalid lines are
+skipped and reported. If a chunk fails, nothing from it is kept and the
+import can be resumed from its first line with ``start_line`` and the failed
+run's ``run_id``. Each chunk stores its posts' refs as ImportedPost rows in
+the same transaction, so the resumed run still resolves refs from before
+that line; the rows are deleted once the run finishes.
+"""
+import json
+import time
+import uuid
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, CharField, DateTimeField, F, IntegerField, Value, When
+from django.db.models.functions import Cast, LPad
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import conditional, timeline, trending
+from .models import PATH_STEP, Comment, ImportedPost, Post
+
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportFailed(Exception):
+    """A chunk could not be written; resume run ``run_id`` from ``line``."""
+
+    def __init__(self, line, stats, run_id):
+        super().__init__(f"Import failed in the chunk starting at line {line}.")
+        self.line = line
+        self.stats = stats
+        self.run_id = run_id
+
+
+class ImportStats:
+    def __init__(self):
+        self.lines = 0
+        self.posts = 0
+        self.comments = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    def skip(self, line, reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': reason})
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return (self.posts + self.comments) / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'posts': self.posts,
+            'comments': self.comments,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'seconds': round(time.monotonic() - self.started, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def _timestamp(value):
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"invalid created_at {value!r}")
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+def _set_timestamps(model, objects):
+    # bulk_create applies auto_now/auto_now_add, so restore the source
+    # timestamps with one UPDATE per chunk.
+    when = [When(pk=obj.pk, then=Value(obj.created_at)) for obj in objects]
+    stamp = Case(*when, output_field=DateTimeField())
+    model.objects.filter(pk__in=[obj.pk for obj in objects]).update(
+        created_at=stamp, updated_at=stamp
+    )
+
+
+class Importer:
+    def __init__(self, chunk_size=1000, progress=None, run_id=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.run_id = run_id or uuid.uuid4().hex
+        self.authors = dict(
+            get_user_model().objects.values_list('username', 'id').iterator()
+        )
+        self.post_refs = {}
+        self.stats = ImportStats()
+
+    def run(self, lines, start_line=1):
+        chunk = []
+        chunk_start = start_line
+        for number, line in enumerate(lines, 1):
+            if number < start_line:
+                continue
+            self.stats.lines += 1
+            record = self._parse(number, line)
+            if record is not None:
+                chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, chunk_start)
+                chunk = []
+                chunk_start = number + 1
+        if chunk:
+            self._flush(chunk, chunk_start)
+        ImportedPost.objects.filter(run_id=self.run_id).delete()
+        transaction.on_commit(
+            lambda: conditional.bump(conditional.POSTS, conditional.COMMENTS)
+        )
+        return self.stats
+
+    def _parse(self, number, line):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            data = json.loads(line)
+            kind = data['type']
+            author_id = self.authors.get(data['author'])
+            if author_id is None:
+                raise ValueError(f"unknown author {data['author']!r}")
+            created_at = _timestamp(data.get('created_at'))
+            if kind == 'post':
+                post = Post(
+                    author_id=author_id,
+                    title=data['title'],
+                    content=data['content'],
+                    created_at=created_at,
+                    trending_score=trending.log_time(created_at),
+                )
+                return (number, post, data.get('ref'))
+            if kind == 'comment':
+                if 'post_ref' not in data and 'post' not in data:
+                    raise ValueError("comment has neither post_ref nor post")
+                post_id = data.get('post')
+                if post_id is not None:
+                    try:
+                        if isinstance(post_id, bool):
+                            raise TypeError
+                        post_id = int(post_id)
+                    except (TypeError, ValueError):
+                        raise ValueError(f"invalid post {post_id!r}")
+                comment = Comment(
+                    author_id=author_id,
+                    post_id=post_id,
+                    content=data['content'],
+                    created_at=created_at,
+                )
+                return (number, comment, data.get('post_ref'))
+            raise ValueError(f"unknown type {kind!r}")
+        except (KeyError, TypeError, ValueError) as exc:
+            reason = f"missing field {exc}" if isinstance(exc, KeyError) else str(exc)
+            self.stats.skip(number, reason)
+            return None
+
+    def _flush(self, chunk, chunk_start):
+        try:
+            with transaction.atomic():
+                posts, comments, refs = self._write(chunk)
+        except Exception as exc:
+            raise ImportFailed(chunk_start, self.stats, self.run_id) from exc
+
+        self.post_refs.update(refs)
+        self.stats.posts += posts
+        self.stats.comments += comments
+        if self.progress:
+            self.progress(self.stats)
+
+    def _write(self, chunk):
+        posts = [(obj, ref) for _, obj, ref in chunk if isinstance(obj, Post)]
+        refs = {}
+        if posts:
+            created = [obj for obj, _ in posts]
+            timestamps = [obj.created_at for obj in created]
+            Post.objects.bulk_create(created)
+            for post, created_at in zip(created, timestamps):
+                post.created_at = created_at
+            _set_timestamps(Post, created)
+            timeline.fan_out_posts(created)
+            refs = {ref: post.pk for post, ref in posts if ref is not None}
+            ImportedPost.objects.bulk_create(
+                [ImportedPost(run_id=self.run_id, ref=ref, post_id=pk) for ref, pk in refs.items()],
+                update_conflicts=True, unique_fields=['run_id', 'ref'], update_fields=['post']
+            )
+
+        # Refs written before a failure are only in the table when resuming.
+        unknown = {
+            post_ref for _, obj, post_ref in chunk
+            if isinstance(obj, Comment) and post_ref is not None
+            and post_ref not in refs and post_ref not in self.post_refs
+        }
+        if unknown:
+            self.post_refs.update(ImportedPost.objects.filter(
+                run_id=self.run_id, ref__in=unknown
+            ).values_list('ref', 'post_id'))
+
+        comments = []
+        for number, obj, post_ref in chunk:
+            if not isinstance(obj, Comment):
+                continue
+            if post_ref is not None:
+                obj.post_id = refs.get(post_ref) or self.post_refs.get(post_ref)
+                if obj.post_id is None:
+                    self.stats.skip(number, f"unknown post_ref {post_ref!r}")
+                    continue
+            comments.append((number, obj))
+
+        if comments:
+            existing = set(Post.objects.filter(
+                pk__in={comment.post_id for _, comment in comments}
+            ).values_list('pk', flat=True))
+            for number, comment in comments:
+                if comment.post_id not in existing:
+                    self.stats.skip(number, f"unknown post {comment.post_id!r}")
+            comments = [comment for _, comment in comments if comment.post_id in existing]
+
+        if comments:
+            timestamps = [comment.created_at for comment in comments]
+            Comment.objects.bulk_create(comments)
+            for comment, created_at in zip(comments, timestamps):
+                comment.created_at = created_at
+            _set_timestamps(Comment, comments)
+            # bulk_create skips Comment.save(); imported comments start threads.
+            Comment.objects.filter(pk__in=[comment.pk for comment in comments]).update(
+                path=LPad(Cast('id', output_field=CharField()), PATH_STEP, Value('0'))
+            )
+
+            added = {}
+            for comment in comments:
+                added[comment.post_id] = added.get(comment.post_id, 0) + 1
+            Post.objects.filter(pk__in=list(added)).update(
+                comment_count=F('comment_count') + Case(
+                    *[When(pk=pk, then=Value(n)) for pk, n in added.items()],
+                    output_field=IntegerField()
+                )
+            )
+
+        return len(posts), len(comments), refs
+
+
+def import_ndjson(lines, chunk_size=1000, start_line=1, progress=None, run_id=None):
+    """
+    Import posts and comments from an iterable of NDJSON lines.
+
+    Returns the ImportStats; raises ImportFailed with the line and run_id to
+    resume with if a chunk cannot be written.
+    """
+    return Importer(chunk_size, progress, run_id).run(lines, start_line)
@@ -0,0 +1,48 @@
+"""
+Idempotent like/unlike writes.
+
+Likes are inserted with INSERT ... ON CONFLICT DO NOTHING on the unique
+(user, post) pair, so concurrent double-taps can never create two rows and
+the statement's row count says exactly whether this call created the like.
+Unlikes use DELETE ... RETURNING so the same round trip also reports when
+the like was made, which posts.trending needs to fold it back out.
+"""
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import Like
+
+
+def insert_like(user_id, post_id):
+    """Insert a like unless it exists. Returns True if a row was inserted."""
+    using = router.db_for_write(Like)
+    connection = connections[using]
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, post_id, created_at) VALUES (%s, %s, %s) "
+            "ON CONFLICT (user_id, post_id) DO NOTHING",
+            [user_id, post_id, connection.ops.adapt_datetimefield_value(timezone.now())]
+        )
+        return cursor.rowcount == 1
+
+
+def delete_like(user_id, post_id):
+    """Delete a like if it exists. Returns its created_at, or None if there was none."""
+    using = router.db_for_write(Like)
+    connection = connections[using]
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE user_id = %s AND post_id = %s RETURNING created_at",
+            [user_id, post_id]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    # Raw cursors skip the field's converters (SQLite returns text).
+    column = Like._meta.get_field('created_at').get_col(Like._meta.db_table)
+    value = row[0]
+    for converter in connection.ops.get_db_converters(column):
+        value = converter(value, column, connection)
+    return value
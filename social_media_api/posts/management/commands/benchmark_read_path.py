@@ -0,0 +1,95 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, prefetch_related_objects
+
+from notifications.fastpath import render_notification
+from notifications.serializers import NotificationSerializer
+from posts import fastpath, timeline
+from posts.models import comment_preview_prefetch
+from posts.serializers import PostSerializer
+from social_media_api.pagination import KeysetPagination
+
+
+def _timed(render, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    # Round-trip through JSON so both sides compare as rendered.
+    return best, json.loads(json.dumps(data))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializer and fast-path rendering of one feed page and one "
+        "notification page, including their queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help="Username to read as; defaults to the user with the largest timeline."
+        )
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help="Runs per renderer; the fastest is reported."
+        )
+
+    def _user(self, username):
+        users = get_user_model().objects.all()
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.annotate(n=Count('timeline_entries')).order_by('-n').first()
+        if user is None:
+            raise CommandError("No such user.")
+        return user
+
+    def handle(self, *args, **options):
+        user = self._user(options['user'])
+        size = options['page_size']
+        repeat = options['repeat']
+        preview = settings.POSTS_COMMENT_PREVIEW_SIZE
+        keyset_slice = KeysetPagination().keyset_slice
+
+        def feed_serializer():
+            entries = timeline.read_feed(user, None, None, size, keyset_slice)
+            posts = [entry.post for entry in entries]
+            prefetch_related_objects(posts, comment_preview_prefetch(preview))
+            return PostSerializer(posts, many=True).data
+
+        def feed_fast():
+            entries = timeline.read_feed(
+                user, None, None, size, keyset_slice, load_posts=False
+            )
+            return fastpath.render_posts([entry.post_id for entry in entries], preview)
+
+        inbox = user.notifications.select_related('actor').order_by('-timestamp', '-id')
+
+        def notifications_serializer():
+            return NotificationSerializer(inbox[:size], many=True).data
+
+        def notifications_fast():
+            rows = inbox.values(*render_notification.columns)[:size]
+            return [render_notification(row) for row in rows]
+
+        self.stdout.write(f"Reading as {user.username}, {size} rows per page, best of {repeat}.")
+        for name, slow, fast in (
+            ('feed', feed_serializer, feed_fast),
+            ('notifications', notifications_serializer, notifications_fast),
+        ):
+            slow_time, slow_data = _timed(slow, repeat)
+            fast_time, fast_data = _timed(fast, repeat)
+            if slow_data != fast_data:
+                raise CommandError(f"{name}: fast path output differs from the serializer's.")
+            self.stdout.write(
+                f"{name}: {len(fast_data)} rows, serializer {slow_time * 1000:.2f} ms, "
+                f"fast path {fast_time * 1000:.2f} ms "
+                f"({slow_time / fast_time if fast_time else 0:.1f}x)"
+            )
@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import ImportFailed, import_ndjson
+
+
+class Command(BaseCommand):
+    help = "Import posts and comments from an NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file to read, or - for stdin.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Records written per transaction."
+        )
+        parser.add_argument(
+            '--start-line', type=int, default=1,
+            help="Skip lines before this one, to resume a failed import."
+        )
+        parser.add_argument(
+            '--run-id',
+            help="Id of the failed import being resumed, so its post refs resolve."
+        )
+
+    def _progress(self, stats):
+        self.stdout.write(
+            f"{stats.lines} lines read: {stats.posts} posts, {stats.comments} comments, "
+            f"{stats.skipped} skipped ({stats.rows_per_second:.0f} rows/s)"
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            stats = import_ndjson(
+                stream,
+                chunk_size=options['chunk_size'],
+                start_line=options['start_line'],
+                progress=self._progress,
+                run_id=options['run_id']
+            )
+        except ImportFailed as exc:
+            raise CommandError(
+                f"{exc} Fix the cause and rerun with --start-line {exc.line} "
+                f"--run-id {exc.run_id}."
+            ) from exc.__cause__
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in stats.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.posts} posts and {stats.comments} comments, "
+            f"skipped {stats.skipped} lines ({stats.rows_per_second:.0f} rows/s)."
+        ))
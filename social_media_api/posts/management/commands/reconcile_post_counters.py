@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Comment, Like, Post
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.like_count and Post.comment_count where they have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help="Number of posts checked per transaction."
+        )
+
+    def _counts(self, model, post_ids):
+        return dict(
+            model.objects.filter(post_id__in=post_ids).values('post_id').annotate(
+                n=Count('id')
+            ).values_list('post_id', 'n')
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        checked = fixed = 0
+
+        while True:
+            with transaction.atomic():
+                posts = list(
+                    Post.objects.filter(pk__gt=last_id).order_by('pk').only(
+                        'id', 'like_count', 'comment_count'
+                    )[:chunk_size]
+                )
+                if not posts:
+                    break
+                post_ids = [post.pk for post in posts]
+                likes = self._counts(Like, post_ids)
+                comments = self._counts(Comment, post_ids)
+
+                drifted = []
+                for post in posts:
+                    like_count = likes.get(post.pk, 0)
+                    comment_count = comments.get(post.pk, 0)
+                    if (post.like_count, post.comment_count) != (like_count, comment_count):
+                        post.like_count = like_count
+                        post.comment_count = comment_count
+                        drifted.append(post)
+                Post.objects.bulk_update(drifted, ['like_count', 'comment_count'])
+
+            checked += len(posts)
+            fixed += len(drifted)
+            last_id = post_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} posts, fixed {fixed} drifted counters."
+        ))
@@ -0,0 +1,214 @@
+import json
+import math
+import random
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from posts.models import Post
+
+DEFAULT_MIX = 'feed=60,like=20,follow=5,notifications=15'
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, share = part.partition('=')
+        name = name.strip()
+        if name not in Command.operations:
+            raise CommandError(
+                f"Unknown operation {name!r}; choose from {', '.join(Command.operations)}."
+            )
+        try:
+            mix[name] = float(share)
+        except ValueError:
+            raise CommandError(f"Invalid share {share!r} for {name}.")
+    if not any(share > 0 for share in mix.values()):
+        raise CommandError("The mix needs at least one operation with a positive share.")
+    return mix
+
+
+def _percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of feed reads, likes, follows and notification polls "
+        "through the Django test client as users created by seed_load_data, and "
+        "write throughput, latency percentiles and queries per endpoint to JSON."
+    )
+
+    operations = ('feed', 'like', 'follow', 'notifications')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--warmup', type=int, default=100,
+            help="Requests sent first and left out of the results."
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f"Relative shares of each operation (default {DEFAULT_MIX})."
+        )
+        parser.add_argument(
+            '--prefix', default='load',
+            help="Username prefix of the seeded users to act as."
+        )
+        parser.add_argument(
+            '--clients', type=int, default=100,
+            help="Number of seeded users sending requests."
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help="JSON file the results are written to."
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        mix = _parse_mix(options['mix'])
+
+        tokens = list(
+            Token.objects.filter(user__username__startswith=options['prefix'])
+            .order_by('user_id').values_list('user_id', 'key')[:options['clients']]
+        )
+        if not tokens:
+            raise CommandError(
+                f"No users named {options['prefix']}* with tokens; run seed_load_data first."
+            )
+        self.tokens = tokens
+        self.user_ids = list(
+            Token.objects.filter(user__username__startswith=options['prefix'])
+            .order_by('user_id').values_list('user_id', flat=True)
+        )
+        self.post_ids = list(Post.objects.order_by('-id').values_list('pk', flat=True)[:10000])
+        if not self.post_ids:
+            raise CommandError("There are no posts to like.")
+        self.liked = set()
+        self.following = set()
+
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        self.client = Client()
+
+        # The test client sends Host: testserver, and every request is made
+        # with secure=True so SECURE_SSL_REDIRECT does not redirect it.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for _ in range(options['warmup']):
+                self._request(self.random.choices(names, weights)[0])
+
+            samples = {name: [] for name in names}
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                name = self.random.choices(names, weights)[0]
+                samples[name].append(self._request(name))
+            elapsed = time.perf_counter() - started
+
+        report = {
+            'commit': _git_commit(),
+            'finished_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'options': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'mix': mix,
+                'clients': len(tokens),
+                'seed': options['seed'],
+            },
+            'seconds': round(elapsed, 3),
+            'throughput': round(options['requests'] / elapsed, 1) if elapsed else None,
+            'endpoints': {
+                name: self._summary(results, elapsed)
+                for name, results in samples.items() if results
+            },
+        }
+        with open(options['output'], 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=2)
+
+        self.stdout.write(
+            f"{'endpoint':<14}{'requests':>9}{'errors':>8}{'req/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for name, summary in report['endpoints'].items():
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f"{name:<14}{summary['requests']:>9}{summary['errors']:>8}"
+                f"{summary['throughput']:>9.1f}{latency['p50']:>9.2f}"
+                f"{latency['p95']:>9.2f}{latency['p99']:>9.2f}"
+                f"{summary['queries']['mean']:>9.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['requests']} requests in {elapsed:.2f}s "
+            f"({report['throughput']} req/s); results written to {options['output']}."
+        ))
+
+    def _summary(self, results, elapsed):
+        latencies = sorted(latency for latency, _, _ in results)
+        queries = [count for _, count, _ in results]
+        return {
+            'requests': len(results),
+            'errors': sum(1 for _, _, status in results if status >= 400),
+            # Share of the run's throughput spent on this endpoint.
+            'throughput': round(len(results) / elapsed, 1) if elapsed else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'p50': round(_percentile(latencies, 0.50), 3),
+                'p95': round(_percentile(latencies, 0.95), 3),
+                'p99': round(_percentile(latencies, 0.99), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            },
+        }
+
+    def _request(self, name):
+        """Send one ``name`` request; return (latency in ms, queries, status)."""
+        user_id, key = self.random.choice(self.tokens)
+        method, path = getattr(self, f'_{name}')(user_id)
+        send = getattr(self.client, method)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = send(path, secure=True, HTTP_AUTHORIZATION=f'Token {key}')
+            latency = (time.perf_counter() - started) * 1000
+        return latency, len(queries), response.status_code
+
+    def _feed(self, user_id):
+        return 'get', '/api/posts/feed/'
+
+    def _notifications(self, user_id):
+        return 'get', '/api/notifications/'
+
+    def _like(self, user_id):
+        # Toggle, so a long run keeps a mix of inserts and deletes.
+        pair = (user_id, self.random.choice(self.post_ids))
+        method = 'delete' if pair in self.liked else 'put'
+        self.liked.symmetric_difference_update({pair})
+        return method, f'/api/posts/posts/{pair[1]}/like/'
+
+    def _follow(self, user_id):
+        target = self.random.choice(self.user_ids)
+        while target == user_id:
+            target = self.random.choice(self.user_ids)
+        pair = (user_id, target)
+        action = 'unfollow' if pair in self.following else 'follow'
+        self.following.symmetric_difference_update({pair})
+        return 'post', f'/api/accounts/{action}/{target}/'
@@ -0,0 +1,235 @@
+import json
+import random
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from notifications.counters import invalidate_unread_count
+from notifications.models import Notification
+from posts.importer import ImportFailed, Importer
+from posts.models import Like, Post
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with a power-law follow graph, posts, comments, likes and "
+        "notifications for load testing (see run_load_benchmark)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help="Average number of users each user follows."
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help="Exponent of the popularity distribution; higher is more skewed."
+        )
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--likes', type=int, default=50000)
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help="Spread post and comment timestamps over this many past days."
+        )
+        parser.add_argument(
+            '--prefix', default='load',
+            help="Username prefix of the generated users."
+        )
+        parser.add_argument(
+            '--password', default='load-password',
+            help="Password of every generated user."
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Users named {prefix}* already exist; choose another --prefix."
+            )
+        if options['users'] < 2:
+            raise CommandError("--users must be at least 2.")
+
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.window = timedelta(days=options['days']).total_seconds()
+
+        users = self._users(User, prefix, options['users'], options['password'])
+        self.user_ids = [user.pk for user in users]
+        # Zipf-like popularity over a random ranking of the users: a few
+        # accounts draw most follows, likes and comments.
+        ranking = self.user_ids[:]
+        self.random.shuffle(ranking)
+        self.weight = {
+            user_id: 1 / (rank + 1) ** options['alpha']
+            for rank, user_id in enumerate(ranking)
+        }
+        self.popular = (ranking, list(accumulate(self.weight[pk] for pk in ranking)))
+
+        follows = self._follows(users, options['follows'])
+        post_ids, posts = self._posts_and_comments(
+            users, options['posts'], options['comments']
+        )
+        likes, notifications = self._likes_and_notifications(
+            post_ids, options['likes']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users ({prefix}*), {follows} follows, "
+            f"{posts.posts} posts, {posts.comments} comments, {likes} likes and "
+            f"{notifications} notifications."
+        ))
+
+    def _popular_users(self, k):
+        ranking, cum_weights = self.popular
+        return self.random.choices(ranking, cum_weights=cum_weights, k=k)
+
+    def _timestamp(self, after=None):
+        start = after or self.now - timedelta(seconds=self.window)
+        return start + (self.now - start) * self.random.random()
+
+    def _users(self, User, prefix, count, password):
+        password = make_password(password)
+        width = len(str(count - 1))
+        users = [
+            User(
+                username=f'{prefix}{i:0{width}d}',
+                email=f'{prefix}{i:0{width}d}@example.com',
+                password=password,
+            )
+            for i in range(count)
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+            if users[0].pk is None:
+                users = list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+            Token.objects.bulk_create(
+                [Token(key=Token.generate_key(), user=user) for user in users],
+                batch_size=BATCH_SIZE
+            )
+        self.stdout.write(f"{len(users)} users")
+        return users
+
+    def _follows(self, users, average):
+        total = 0
+        for start in range(0, len(users), BATCH_SIZE):
+            with transaction.atomic():
+                for user in users[start:start + BATCH_SIZE]:
+                    wanted = min(
+                        len(users) - 1,
+                        max(1, round(self.random.expovariate(1 / average)))
+                    )
+                    targets = set(self._popular_users(wanted * 2)) - {user.pk}
+                    targets = list(targets)[:wanted]
+                    # add() sends m2m_changed, which maintains the follow
+                    # counters, timelines and suggestion graph.
+                    user.following.add(*targets)
+                    total += len(targets)
+            self.stdout.write(f"{total} follows")
+        return total
+
+    def _posts_and_comments(self, users, post_count, comment_count):
+        usernames = {user.pk: user.username for user in users}
+        posts = []
+        for _ in range(post_count):
+            author_id = self.random.choice(self.user_ids)
+            posts.append((author_id, self._timestamp()))
+
+        def lines():
+            for i, (author_id, created_at) in enumerate(posts):
+                yield json.dumps({
+                    'type': 'post',
+                    'ref': str(i),
+                    'author': usernames[author_id],
+                    'title': f"Post {i} by {usernames[author_id]}",
+                    'content': f"Generated post {i}. " * self.random.randint(1, 20),
+                    'created_at': created_at.isoformat(),
+                })
+            if not posts:
+                return
+            # Posts by popular authors draw most of the comments.
+            cum_weights = list(accumulate(self.weight[author_id] for author_id, _ in posts))
+            for i in range(comment_count):
+                ref = self.random.choices(range(len(posts)), cum_weights=cum_weights)[0]
+                yield json.dumps({
+                    'type': 'comment',
+                    'post_ref': str(ref),
+                    'author': usernames[self.random.choice(self.user_ids)],
+                    'content': f"Generated comment {i}.",
+                    'created_at': self._timestamp(after=posts[ref][1]).isoformat(),
+                })
+
+        importer = Importer(
+            chunk_size=BATCH_SIZE,
+            progress=lambda stats: self.stdout.write(
+                f"{stats.posts} posts, {stats.comments} comments"
+            )
+        )
+        try:
+            stats = importer.run(lines())
+        except ImportFailed as exc:
+            raise CommandError(str(exc)) from exc.__cause__
+        return (
+            [importer.post_refs[str(i)] for i in range(len(posts))],
+            stats
+        )
+
+    def _likes_and_notifications(self, post_ids, like_count):
+        if not post_ids:
+            return 0, 0
+        authors = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'author_id'))
+        cum_weights = list(accumulate(self.weight[authors[pk]] for pk in post_ids))
+        pairs = set()
+        for _ in range(like_count * 2):
+            if len(pairs) >= like_count:
+                break
+            post_id = self.random.choices(post_ids, cum_weights=cum_weights)[0]
+            pairs.add((self.random.choice(self.user_ids), post_id))
+
+        likers = {}
+        for user_id, post_id in sorted(pairs, key=lambda pair: pair[1]):
+            if user_id != authors[post_id]:
+                likers.setdefault(post_id, []).append(user_id)
+        liked = Counter(post_id for _, post_id in pairs)
+        post_type = ContentType.objects.get_for_model(Post)
+
+        with transaction.atomic():
+            Like.objects.bulk_create(
+                [Like(user_id=user_id, post_id=post_id) for user_id, post_id in pairs],
+                batch_size=BATCH_SIZE
+            )
+            Post.objects.bulk_update(
+                [Post(pk=pk, like_count=n) for pk, n in liked.items()],
+                ['like_count'], batch_size=BATCH_SIZE
+            )
+            # One notification per liked post, coalesced the way the
+            # dispatcher folds likes into actor_count.
+            notifications = [
+                Notification(
+                    recipient_id=authors[post_id],
+                    actor_id=actor_ids[-1],
+                    actor_count=len(actor_ids),
+                    actor_ids=actor_ids,
+                    verb='liked your post',
+                    content_type=post_type,
+                    object_id=post_id,
+                    is_read=self.random.random() < 0.5,
+                )
+                for post_id, actor_ids in likers.items()
+            ]
+            Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+            invalidate_unread_count(*{authors[post_id] for post_id in likers})
+        return len(pairs), len(notifications)
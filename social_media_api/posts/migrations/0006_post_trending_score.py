@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:28
+
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def score_existing(apps, schema_editor):
+    # Treat existing activity as if it happened when the post was created.
+    Post = apps.get_model('posts', 'Post')
+    epoch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 6)
+
+    batch = []
+    for post in Post.objects.only('id', 'created_at', 'like_count', 'comment_count').iterator():
+        hours = (post.created_at - epoch).total_seconds() / 3600
+        weight = 1 + post.like_count + 2 * post.comment_count
+        post.trending_score = math.log2(weight) + hours / half_life
+        batch.append(post)
+        if len(batch) >= 500:
+            Post.objects.bulk_update(batch, ['trending_score'])
+            batch = []
+    Post.objects.bulk_update(batch, ['trending_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.RunPython(score_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:54
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def flag_unpushed_posts(apps, schema_editor):
+    # A post of an author with followers that has no timeline copies was
+    # never fanned out, so until now it was pulled by the author's follower
+    # count. Decided from the data alone, not from the FEED_MODE in effect
+    # when the migration runs.
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    Post.objects.filter(author__follower_count__gt=0).exclude(
+        Exists(TimelineEntry.objects.filter(post_id=OuterRef('pk')))
+    ).update(pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_follow_counters'),
+        ('posts', '0008_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='pulled',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('pulled', True)), fields=['author', '-created_at', '-id'], name='posts_post_pulled_idx'),
+        ),
+        migrations.RunPython(flag_unpushed_posts, migrations.RunPython.noop),
+    ]
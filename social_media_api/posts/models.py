@@ -3,9 +3,75 @@ from django.db import models
 # Create your models here.
 
 from django.conf import settings
+from django.db.models import F, Prefetch, Q, Window
+from django.db.models.functions import RowNumber, Substr
 
 User = settings.AUTH_USER_MODEL
 
+# Width of one id in Comment.path, and how deep replies may nest.
+PATH_STEP = 10
+MAX_DEPTH = 20
+
+
+def attach_reply_previews(threads, size):
+    """
+    Fetch the first ``size`` replies of each top-level comment in one query,
+    in depth-first order, into ``comment.reply_preview``. Sets
+    ``comment.has_more_replies`` when a thread has more than that.
+    """
+    for thread in threads:
+        thread.reply_preview = []
+        thread.has_more_replies = False
+    if not threads:
+        return
+
+    ranges = Q()
+    for thread in threads:
+        ranges |= thread.subtree_range()
+    replies = Comment.objects.filter(ranges).select_related('author').annotate(
+        rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('post_id'), Substr('path', 1, PATH_STEP)],
+            order_by=F('path').asc()
+        )
+    ).filter(rank__lte=size + 1).order_by('path')
+
+    by_path = {thread.path: thread for thread in threads}
+    for reply in replies:
+        thread = by_path[reply.path[:PATH_STEP]]
+        if len(thread.reply_preview) < size:
+            thread.reply_preview.append(reply)
+        else:
+            thread.has_more_replies = True
+
+
+def comment_preview_queryset(size):
+    """The latest ``size`` comments of each post, ranked with a window function."""
+    return Comment.objects.select_related('author').annotate(
+        rank=Window(
+            expression=RowNumber(),
+            partition_by=F('post_id'),
+            order_by=[F('created_at').desc(), F('id').desc()]
+        )
+    ).filter(rank__lte=size).order_by('-created_at', '-id')
+
+
+def comment_preview_prefetch(size):
+    """
+    Prefetch only the latest ``size`` comments of each post into
+    ``post.comment_preview``.
+    """
+    latest = comment_preview_queryset(size)
+    return Prefetch('comments', queryset=latest, to_attr='comment_preview')
+
+
+class PostQuerySet(models.QuerySet):
+    def with_comment_preview(self, size):
+        return self.select_related('author').prefetch_related(
+            comment_preview_prefetch(size)
+        )
+
+
 class Post(models.Model):
     author = models.ForeignKey(
         User,
@@ -16,10 +82,43 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, maintained by posts.counters.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Decayed activity score in log space, maintained by posts.trending.
+    trending_score = models.FloatField(default=0, db_index=True)
+    # Last like/comment activity, maintained by posts.counters; feeds the
+    # conditional GET validators together with updated_at.
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    # Set when the post was not fanned out because its author was over the
+    # feed threshold; such posts are merged into feeds at read time.
+    pulled = models.BooleanField(default=False, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='posts_post_author_time_idx'
+            ),
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                condition=models.Q(pulled=True),
+                name='posts_post_pulled_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.trending_score:
+            from .trending import log_time
+            # A new post starts with the weight of one unit of activity.
+            self.trending_score = log_time(self.created_at)
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -32,12 +131,50 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='replies'
+    )
+    # Materialized path: the zero-padded ids of the thread's comments from
+    # the top-level one down to this one, so ordering by path lists a
+    # thread depth-first and a subtree is one index range.
+    path = models.CharField(max_length=PATH_STEP * (MAX_DEPTH + 1), blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'path'], name='posts_comment_post_path_idx'),
+            # Pages of a post's top-level threads.
+            models.Index(
+                fields=['post', '-created_at', '-id'],
+                condition=models.Q(parent__isnull=True),
+                name='posts_comment_thread_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            # The path ends with this comment's own id, known only now.
+            parent_path = self.parent.path if self.parent_id else ''
+            self.path = parent_path + str(self.pk).zfill(PATH_STEP)
+            self.depth = len(self.path) // PATH_STEP - 1
+            Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+    def subtree_range(self):
+        """Q matching every reply below this comment on the (post, path) index."""
+        # Digits sort below ':', so descendants lie strictly inside this range.
+        return Q(post_id=self.post_id, path__gt=self.path, path__lt=self.path + ':')
 class Like(models.Model):
     user = models.ForeignKey(
         User,
@@ -55,4 +192,48 @@ class Like(models.Model):
         unique_together = ('user', 'post')
 
     def __str__(self):
-        return f"{self.user} liked {self.post}"
\ No newline at end of file
+        return f"{self.user} liked {self.post}"
+
+
+class TimelineEntry(models.Model):
+    """A post copied into one follower's home timeline at write time."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Copied from the post so the feed can be read straight off the index.
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-post'],
+                name='posts_timeline_user_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post} in {self.user}'s timeline"
+
+
+class ImportedPost(models.Model):
+    """
+    The post an NDJSON import created for a ``ref``, kept until the run
+    finishes so a run resumed after a failure still resolves ``post_ref``.
+    """
+    run_id = models.CharField(max_length=32)
+    ref = models.CharField(max_length=255)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('run_id', 'ref')
+
+    def __str__(self):
+        return f"{self.ref} -> {self.post_id} ({self.run_id})"
@@ -0,0 +1,128 @@
+"""
+Full-text search for posts backed by an SQLite FTS5 index.
+
+``posts_post_fts`` is an external-content FTS5 table over Post.title and
+Post.content, kept in sync by triggers on posts_post so every write path
+(including bulk_create and raw SQL) is covered. Django does not manage the
+table; install_fts() creates it after each migrate, and recreates the
+triggers if a migration rebuilt posts_post and dropped them.
+"""
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.models import Case, IntegerField, When
+from rest_framework import filters
+
+FTS_TABLE = 'posts_post_fts'
+
+_TRIGGERS = {
+    'posts_post_fts_ai': f"""
+        CREATE TRIGGER posts_post_fts_ai AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END
+    """,
+    'posts_post_fts_ad': f"""
+        CREATE TRIGGER posts_post_fts_ad AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    """,
+    # Only title/content edits touch the index, not counter updates.
+    'posts_post_fts_au': f"""
+        CREATE TRIGGER posts_post_fts_au AFTER UPDATE OF title, content ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO {FTS_TABLE}(rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END
+    """,
+}
+
+_available = {}
+
+
+def install_fts(using='default'):
+    """Create the FTS5 table and triggers if missing. Returns True on success."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if 'posts_post' not in connection.introspection.table_names():
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            list(_TRIGGERS)
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "title, content, content='posts_post', content_rowid='id')"
+            )
+        except OperationalError:
+            # SQLite was built without FTS5; search falls back to LIKE.
+            return False
+
+        for name, sql in _TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(sql)
+        if len(existing) < len(_TRIGGERS):
+            # Writes may have happened while triggers were missing.
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    _available.pop(using, None)
+    return True
+
+
+def fts_available(using='default'):
+    if using not in _available:
+        connection = connections[using]
+        found = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [FTS_TABLE]
+                )
+                found = cursor.fetchone() is not None
+        _available[using] = found
+    return _available[using]
+
+
+def match_expression(terms):
+    """Quote each search term as an FTS5 prefix query, all terms required."""
+    return ' AND '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` over the FTS5 index, ranked by BM25 (title weighted above
+    content). Falls back to SearchFilter's LIKE scans when the index is
+    unavailable.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not fts_available(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        limit = getattr(settings, 'POSTS_SEARCH_MAX_RESULTS', 1000)
+        try:
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                    f"ORDER BY bm25({FTS_TABLE}, 2.0, 1.0) LIMIT %s",
+                    [match_expression(terms), limit]
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+        except OperationalError:
+            return super().filter_queryset(request, queryset, view)
+
+        if not ids:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        )
+        return queryset.filter(pk__in=ids).order_by(rank)
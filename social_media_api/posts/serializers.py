@@ -1,7 +1,14 @@
 from rest_framework import serializers
-from .models import Post, Comment
+from accounts.images import thumbnail_urls
+from accounts.serializers import AuthorSerializer
+from social_media_api.fieldsets import SparseFieldsMixin
+from .models import MAX_DEPTH, Post, Comment
 
-class CommentSerializer(serializers.ModelSerializer):
+def _expanded_author():
+    return AuthorSerializer(read_only=True)
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
 
     class Meta:
@@ -9,27 +16,85 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'post',
+            'parent',
+            'depth',
             'author',
             'content',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ['author']
+        read_only_fields = ['author', 'depth']
+        expandable_fields = {'author': _expanded_author}
+
+    def validate(self, attrs):
+        parent = attrs.get('parent')
+        if self.instance is not None:
+            # Paths and comment counts assume a comment never changes place.
+            if 'post' in attrs and attrs['post'].pk != self.instance.post_id:
+                raise serializers.ValidationError(
+                    {'post': "A comment cannot be moved to another post."}
+                )
+            if 'parent' in attrs and parent != self.instance.parent:
+                raise serializers.ValidationError({'parent': "A reply cannot be moved."})
+            return attrs
+        if parent is not None:
+            if parent.post_id != attrs['post'].pk:
+                raise serializers.ValidationError(
+                    {'parent': "The parent comment belongs to a different post."}
+                )
+            if parent.depth >= MAX_DEPTH:
+                raise serializers.ValidationError(
+                    {'parent': f"Replies cannot be nested more than {MAX_DEPTH} levels deep."}
+                )
+        return attrs
+
+
+class CommentThreadSerializer(CommentSerializer):
+    """A top-level comment with the preview of its replies attached."""
+    replies = serializers.SerializerMethodField()
+    has_more_replies = serializers.BooleanField(read_only=True)
 
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['replies', 'has_more_replies']
+        field_columns = {'replies': (), 'has_more_replies': ()}
 
-class PostSerializer(serializers.ModelSerializer):
+    def get_replies(self, obj):
+        return CommentSerializer(obj.reply_preview, many=True, context=self.context).data
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
-    comments = CommentSerializer(many=True, read_only=True)
+    author_thumbnails = serializers.SerializerMethodField()
+    comments = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = [
             'id',
             'author',
+            'author_thumbnails',
             'title',
             'content',
             'comments',
+            'like_count',
+            'comment_count',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ['author']
+        read_only_fields = ['author', 'like_count', 'comment_count']
+        expandable_fields = {'author': _expanded_author}
+        # Comments are prefetched separately, see PostViewSet.get_queryset.
+        field_columns = {
+            'author_thumbnails': ('author__profile_thumbnails',),
+            'comments': (),
+        }
+
+    def get_author_thumbnails(self, obj):
+        return thumbnail_urls(obj.author.profile_thumbnails, self.context.get('request'))
+
+    def get_comments(self, obj):
+        # Post endpoints prefetch a capped preview instead of every comment.
+        comments = getattr(obj, 'comment_preview', None)
+        if comments is None:
+            comments = obj.comments.all()
+        return CommentSerializer(comments, many=True, context=self.context).data
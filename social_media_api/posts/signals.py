@@ -0,0 +1,70 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import conditional, timeline
+from .search import install_fts
+from .models import Comment, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_collection_versions(sender, **kwargs):
+    # Post payloads embed comments, so comment writes change both lists.
+    names = (conditional.POSTS, conditional.COMMENTS)
+    transaction.on_commit(partial(conditional.bump, *names))
+
+
+# User columns embedded in post and comment payloads, directly or through
+# ?expand=author.
+AUTHOR_FIELDS = {'username', 'bio', 'profile_thumbnails'}
+
+
+@receiver(post_save, sender=User)
+def bump_collections_on_author_change(sender, update_fields=None, **kwargs):
+    # Saves of other columns (last_login, password) leave payloads unchanged.
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    names = (conditional.POSTS, conditional.COMMENTS)
+    transaction.on_commit(partial(conditional.bump, *names))
+
+
+@receiver(m2m_changed, sender=User.followers.through)
+def sync_timelines_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=True when called as follower.following.add(author), and
+    # reverse=False when called as author.followers.add(follower).
+    if action == 'pre_clear':
+        if reverse:
+            TimelineEntry.objects.filter(user=instance).delete()
+        else:
+            TimelineEntry.objects.filter(post__author=instance).delete()
+        return
+
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    sync = timeline.add_authors if action == 'post_add' else timeline.remove_authors
+    if reverse:
+        sync(instance.pk, pk_set)
+    else:
+        for follower_id in pk_set:
+            sync(follower_id, [instance.pk])
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    if sender.name == 'posts':
+        install_fts(using)
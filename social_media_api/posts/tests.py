@@ -1,3 +1,476 @@
-from django.test import TestCase
+import json
+from importlib import import_module
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+from notifications.models import Notification
+from social_media_api.pagination import KeysetPagination
+from social_media_api.testing import client_for
+
+from . import trending
+from .importer import ImportFailed, import_ndjson
+from .models import Comment, ImportedPost, Like, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class FeedPaginationTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.reader = User.objects.create_user('reader')
+        self.reader.following.add(self.author)
+        self.posts = [
+            Post.objects.create(author=self.author, title=f'post {i}', content='text')
+            for i in range(5)
+        ]
+        self.client = client_for(self.reader)
+
+    def titles(self, response):
+        return [post['title'] for post in response.json()['results']]
+
+    def test_before_cursors_walk_the_whole_feed_once(self):
+        seen = []
+        url = '/api/posts/feed/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            seen += [post['id'] for post in page['results']]
+            url = page['next']
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_previous_link_returns_the_page_before(self):
+        first = self.client.get('/api/posts/feed/?page_size=2')
+        second = self.client.get(first.json()['next'])
+        self.assertEqual(self.titles(second), ['post 2', 'post 1'])
+
+        back = self.client.get(second.json()['previous'])
+        self.assertEqual(self.titles(back), self.titles(first))
+
+    def test_after_cursor_returns_newer_posts(self):
+        newest = self.posts[-1]
+        cursor = KeysetPagination().encode_cursor((newest.created_at, newest.pk))
+        Post.objects.create(author=self.author, title='newer', content='text')
+
+        response = self.client.get(f'/api/posts/feed/?after={cursor}')
+        self.assertEqual(self.titles(response), ['newer'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/posts/feed/?before=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class HybridFeedTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.reader = User.objects.create_user('reader')
+        self.reader.following.add(self.author)
+        self.client = client_for(self.reader)
+
+    def titles(self):
+        return [post['title'] for post in self.client.get('/api/posts/feed/').json()['results']]
+
+    @override_settings(FEED_MODE='hybrid', FEED_FANOUT_THRESHOLD=1)
+    def test_pulled_posts_stay_in_feed_after_threshold_change(self):
+        Post.objects.create(author=self.author, title='pulled', content='text')
+        self.assertTrue(Post.objects.get(title='pulled').pulled)
+        self.assertFalse(TimelineEntry.objects.exists())
+        with self.settings(FEED_FANOUT_THRESHOLD=100):
+            self.assertEqual(self.titles(), ['pulled'])
+
+    def test_migration_flags_posts_that_were_never_fanned_out(self):
+        Post.objects.create(author=self.author, title='pushed', content='text')
+        unpushed = Post.objects.create(author=self.author, title='unpushed', content='text')
+        TimelineEntry.objects.filter(post=unpushed).delete()
+
+        import_module('posts.migrations.0009_post_pulled').flag_unpushed_posts(apps, None)
+        self.assertEqual(list(Post.objects.filter(pulled=True)), [unpushed])
+        self.assertEqual(self.titles(), ['unpushed', 'pushed'])
+
+
+@override_settings(POSTS_COMMENT_PREVIEW_SIZE=2)
+class CommentPreviewTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.client = client_for(self.author)
+
+    def add_post(self, comments):
+        post = Post.objects.create(author=self.author, title='t', content='c')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.author, content=str(i)) for i in range(comments)
+        )
+        return post
+
+    def test_detail_embeds_a_capped_preview(self):
+        post = self.add_post(5)
+        for method in ('get', 'patch'):
+            response = getattr(self.client, method)(f'/api/posts/posts/{post.pk}/')
+            self.assertEqual(len(response.json()['comments']), 2)
+
+    def test_list_queries_do_not_grow_with_posts(self):
+        # Count, posts with their authors, and one windowed comment query.
+        self.add_post(3)
+        self.client.get('/api/posts/posts/')
+        with self.assertNumQueries(3):
+            self.client.get('/api/posts/posts/')
+        for _ in range(3):
+            self.add_post(3)
+        with self.assertNumQueries(3):
+            self.client.get('/api/posts/posts/')
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=self.author, title='t', content='c')
+        self.other = Post.objects.create(author=self.author, title='other', content='c')
+        self.client = client_for(self.author)
+
+    def comment(self, parent=None, post=None):
+        data = {'post': (post or self.post).pk, 'content': 'text'}
+        if parent:
+            data['parent'] = parent
+        return self.client.post('/api/posts/comments/', data).json()
+
+    def test_replies_extend_the_parent_path(self):
+        root = self.comment()
+        reply = self.comment(parent=root['id'])
+        nested = self.comment(parent=reply['id'])
+
+        root, reply, nested = (Comment.objects.get(pk=c['id']) for c in (root, reply, nested))
+        self.assertEqual((root.depth, reply.depth, nested.depth), (0, 1, 2))
+        self.assertTrue(nested.path.startswith(reply.path) and reply.path.startswith(root.path))
+        self.assertEqual(set(Comment.objects.filter(root.subtree_range())), {reply, nested})
+
+    def test_thread_listing_is_depth_first(self):
+        first = self.comment()
+        second = self.comment()
+        reply = self.comment(parent=first['id'])
+        response = self.client.get(f'/api/posts/comments/?post={self.post.pk}')
+        self.assertEqual(
+            [c['id'] for c in response.json()['results']],
+            [first['id'], reply['id'], second['id']]
+        )
+
+    def test_reply_must_be_on_the_parent_post(self):
+        root = self.comment()
+        response = self.client.post('/api/posts/comments/', {
+            'post': self.other.pk, 'parent': root['id'], 'content': 'text'
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_comments_cannot_change_post(self):
+        root = self.comment()
+        reply = self.comment(parent=root['id'])
+        for comment in (root, reply):
+            response = self.client.patch(
+                f'/api/posts/comments/{comment["id"]}/', {'post': self.other.pk}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('post', response.json())
+        self.assertEqual(set(Comment.objects.values_list('post_id', flat=True)), {self.post.pk})
+
+        response = self.client.patch(
+            f'/api/posts/comments/{reply["id"]}/', {'post': self.post.pk, 'content': 'edited'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class CounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.fan = User.objects.create_user('fan')
+        self.post = Post.objects.create(author=self.author, title='t', content='c')
+        self.client = client_for(self.author)
+
+    def counts(self, post=None):
+        post = post or self.post
+        post.refresh_from_db()
+        return post.like_count, post.comment_count
+
+    def comment(self, **data):
+        return self.client.post(
+            '/api/posts/comments/', {'post': self.post.pk, 'content': 'text', **data}
+        ).json()
+
+    def test_likes_count_once_per_user(self):
+        fan = client_for(self.fan)
+        fan.post(f'/api/posts/likes/{self.post.pk}/')
+        self.assertEqual(fan.post(f'/api/posts/likes/{self.post.pk}/').status_code, 400)
+        self.assertEqual(self.counts(), (1, 0))
+        for _ in range(2):
+            fan.post(f'/api/posts/unlikes/{self.post.pk}/')
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_deleting_a_thread_subtracts_its_replies(self):
+        root = self.comment()
+        self.comment(parent=root['id'])
+        self.comment()
+        self.assertEqual(self.counts(), (0, 3))
+
+        self.client.delete(f'/api/posts/comments/{root["id"]}/')
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_rejected_move_leaves_both_counts(self):
+        other = Post.objects.create(author=self.author, title='other', content='c')
+        comment = self.comment()
+        self.client.patch(f'/api/posts/comments/{comment["id"]}/', {'post': other.pk})
+        self.assertEqual((self.counts(), self.counts(other)), ((0, 1), (0, 0)))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.client = client_for(self.author)
+
+    def found(self, term):
+        response = self.client.get(f'/api/posts/posts/?search={term}')
+        return [post['id'] for post in response.json()['results']]
+
+    def test_search_follows_edits_and_deletes(self):
+        post = Post.objects.create(author=self.author, title='sourdough', content='bread')
+        self.assertEqual(self.found('sourdough'), [post.pk])
+        post.title = 'focaccia'
+        post.save()
+        self.assertEqual(self.found('sourdough'), [])
+        self.assertEqual(self.found('focac'), [post.pk])
+
+        post.delete()
+        self.assertEqual(self.found('focac'), [])
+
+    def test_every_term_must_match(self):
+        post = Post.objects.create(author=self.author, title='rye bread', content='dense')
+        Post.objects.create(author=self.author, title='rye whiskey', content='smooth')
+        self.assertEqual(self.found('rye dense'), [post.pk])
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, TRENDING_REFRESH_INTERVAL=0)
+class TrendingTests(TestCase):
+    def setUp(self):
+        trending.top_posts._expires = 0.0
+        self.author = User.objects.create_user('author')
+        self.fans = [User.objects.create_user(f'fan{i}') for i in range(3)]
+        self.toggled = Post.objects.create(author=self.author, title='toggled', content='c')
+        self.liked = Post.objects.create(author=self.author, title='liked', content='c')
+        for fan in self.fans:
+            client_for(fan).put(f'/api/posts/posts/{self.liked.pk}/like/')
+
+    def titles(self):
+        response = client_for(self.author).get('/api/posts/trending/')
+        return [post['title'] for post in response.json()['results']]
+
+    def score(self, post):
+        post.refresh_from_db()
+        return post.trending_score
+
+    def test_toggling_a_like_does_not_inflate_the_score(self):
+        before = self.score(self.toggled)
+        client = client_for(self.fans[0])
+        url = f'/api/posts/posts/{self.toggled.pk}/like/'
+        for _ in range(10):
+            client.put(url)
+            client.delete(url)
+        self.assertAlmostEqual(self.score(self.toggled), before, places=6)
+        self.assertEqual(self.titles(), ['liked', 'toggled'])
+
+    def test_legacy_unlike_folds_the_like_out(self):
+        before = self.score(self.toggled)
+        client = client_for(self.fans[0])
+        client.post(f'/api/posts/likes/{self.toggled.pk}/')
+        self.assertGreater(self.score(self.toggled), before)
+        client.post(f'/api/posts/unlikes/{self.toggled.pk}/')
+        self.assertAlmostEqual(self.score(self.toggled), before, places=6)
+
+    def test_deleting_a_thread_folds_its_comments_out(self):
+        before = self.score(self.toggled)
+        client = client_for(self.author)
+        root = client.post(
+            '/api/posts/comments/', {'post': self.toggled.pk, 'content': 'c'}
+        ).json()
+        client.post(
+            '/api/posts/comments/', {'post': self.toggled.pk, 'parent': root['id'], 'content': 'c'}
+        )
+        client.delete(f'/api/posts/comments/{root["id"]}/')
+        self.assertAlmostEqual(self.score(self.toggled), before, places=6)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class LikeToggleTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.fan = User.objects.create_user('fan')
+        self.post = Post.objects.create(author=self.author, title='t', content='c')
+        self.client = client_for(self.fan)
+        self.url = f'/api/posts/posts/{self.post.pk}/like/'
+
+    def test_repeated_likes_and_unlikes_count_once(self):
+        for method in ('put', 'put', 'delete', 'delete', 'put'):
+            response = getattr(self.client, method)(self.url)
+            self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(response.json(), {'liked': True, 'like_count': 1})
+
+    def test_liking_a_missing_post_is_404(self):
+        self.assertEqual(self.client.put('/api/posts/posts/999999/like/').status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.post = Post.objects.create(author=self.author, title='t', content='c')
+        self.client = client_for(self.author)
+
+    def assert_revalidates(self, url, write):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_list(self):
+        self.assert_revalidates('/api/posts/posts/', lambda: self.client.post(
+            '/api/posts/posts/', {'title': 'new', 'content': 'c'}
+        ))
+
+    def test_post_detail(self):
+        self.assert_revalidates(f'/api/posts/posts/{self.post.pk}/', lambda: self.client.post(
+            '/api/posts/comments/', {'post': self.post.pk, 'content': 'hi'}
+        ))
+
+    def test_post_comments(self):
+        self.assert_revalidates(f'/api/posts/posts/{self.post.pk}/comments/', lambda: self.client.post(
+            '/api/posts/comments/', {'post': self.post.pk, 'content': 'hi'}
+        ))
+
+    def test_comment_detail(self):
+        comment = self.client.post(
+            '/api/posts/comments/', {'post': self.post.pk, 'content': 'hi'}
+        ).json()
+        url = f'/api/posts/comments/{comment["id"]}/'
+        self.assert_revalidates(url, lambda: self.client.patch(url, {'content': 'edited'}))
+
+    def test_if_modified_since_never_answers_304(self):
+        # A like in the same second as the cached copy must not be missed.
+        for url in ('/api/posts/posts/', f'/api/posts/posts/{self.post.pk}/'):
+            response = self.client.get(url)
+            self.assertNotIn('Last-Modified', response)
+            client_for(self.author).put(f'/api/posts/posts/{self.post.pk}/like/')
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+            self.assertEqual(response.status_code, 200)
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+
+    def test_comment_post_id_may_be_a_string(self):
+        post = Post.objects.create(author=self.author, title='t', content='c')
+        lines = [
+            json.dumps({'type': 'comment', 'post': str(post.pk), 'author': 'author', 'content': 'a'}),
+            json.dumps({'type': 'comment', 'post': 'x', 'author': 'author', 'content': 'b'}),
+        ]
+        stats = import_ndjson(lines)
+        self.assertEqual((stats.comments, stats.skipped), (1, 1))
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_resumed_run_resolves_refs_from_before_the_failure(self):
+        def lines(broken):
+            return [json.dumps(record) for record in (
+                {'type': 'post', 'ref': 'a', 'author': 'author', 'title': 'a', 'content': 'c'},
+                {'type': 'post', 'ref': 'b', 'author': 'author', 'title': 'b', 'content': 'c'},
+                {'type': 'comment', 'post_ref': 'a', 'author': 'author',
+                 'content': None if broken else 'on a'},
+                {'type': 'comment', 'post_ref': 'b', 'author': 'author', 'content': 'on b'},
+            )]
+
+        with self.assertRaises(ImportFailed) as failure:
+            import_ndjson(lines(broken=True), chunk_size=2)
+        self.assertEqual(failure.exception.line, 3)
+        self.assertFalse(Comment.objects.exists())
+
+        stats = import_ndjson(
+            lines(broken=False), chunk_size=2,
+            start_line=failure.exception.line, run_id=failure.exception.run_id
+        )
+        self.assertEqual((stats.posts, stats.comments, stats.skipped), (0, 2, 0))
+        self.assertEqual(
+            set(Comment.objects.values_list('post__title', 'content')),
+            {('a', 'on a'), ('b', 'on b')}
+        )
+        self.assertFalse(ImportedPost.objects.exists())
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', bio='old bio')
+        self.post = Post.objects.create(author=self.author, title='t', content='c')
+        self.comment = Comment.objects.create(post=self.post, author=self.author, content='hi')
+        self.client = client_for(self.author)
+
+    def test_fields_limits_the_payload(self):
+        response = self.client.get(f'/api/posts/posts/{self.post.pk}/?fields=id,title')
+        self.assertEqual(response.json(), {'id': self.post.pk, 'title': 't'})
+
+    def test_expand_nests_the_author(self):
+        response = self.client.get(f'/api/posts/posts/{self.post.pk}/?expand=author&fields=author')
+        self.assertEqual(response.json()['author'], {
+            'id': self.author.pk, 'username': 'author', 'bio': 'old bio', 'profile_thumbnails': {}
+        })
+
+    def test_profile_edits_revalidate_expanded_authors(self):
+        urls = [
+            f'/api/posts/posts/{self.post.pk}/?expand=author',
+            '/api/posts/posts/?expand=author',
+            f'/api/posts/comments/{self.comment.pk}/?expand=author',
+            '/api/posts/comments/?expand=author',
+            f'/api/posts/posts/{self.post.pk}/comments/?expand=author',
+        ]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/api/accounts/profile/', {'bio': 'new bio'})
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIn('new bio', response.content.decode(), url)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class FastPathTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.author.profile_thumbnails = {'48': {'webp': 'profiles/thumbnails/x-48.webp'}}
+        self.author.save()
+        self.reader = User.objects.create_user('reader')
+        self.reader.following.add(self.author)
+        self.author_client = client_for(self.author)
+        self.reader_client = client_for(self.reader)
+        for i in range(4):
+            post = Post.objects.create(author=self.author, title=f'post {i}', content='c')
+            for _ in range(i):
+                self.author_client.post('/api/posts/comments/', {'post': post.pk, 'content': 'hi'})
+            self.reader_client.put(f'/api/posts/posts/{post.pk}/like/')
+
+    def assert_same_output(self, client, url):
+        while url:
+            with self.settings(API_FAST_READ_PATH=False):
+                expected = client.get(url).json()
+            with self.settings(API_FAST_READ_PATH=True):
+                actual = client.get(url).json()
+            self.assertEqual(actual, expected)
+            url = actual['next']
+
+    def test_feed(self):
+        self.assert_same_output(self.reader_client, '/api/posts/feed/?page_size=3')
+
+    def test_notifications(self):
+        self.assertEqual(Notification.objects.count(), 4)
+        self.assert_same_output(self.author_client, '/api/notifications/?page_size=3')
@@ -0,0 +1,169 @@
+"""
+Materialized home timelines.
+
+Every post is copied into the timeline of each of its author's followers when
+it is written, so reading a feed is an index-ordered slice of one table rather
+than a join across the follow graph.
+
+With ``FEED_MODE = 'hybrid'`` authors with at least ``FEED_FANOUT_THRESHOLD``
+followers are not fanned out: their posts are flagged ``pulled`` and merged
+into the pushed timeline at read time, which keeps write amplification
+bounded for very popular accounts. Reads go by the flag recorded when each
+post was written, not by the author's current follower count, so a post
+stays in feeds when its author later drops below the threshold or the
+setting changes.
+"""
+import heapq
+from itertools import islice
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _follows():
+    # Rows of the through table read as (from_user=author, to_user=follower).
+    return get_user_model().followers.through.objects
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def _pull_threshold():
+    if getattr(settings, 'FEED_MODE', 'push') != 'hybrid':
+        return None
+    return settings.FEED_FANOUT_THRESHOLD
+
+
+def pull_authors(author_ids):
+    """Return the subset of ``author_ids`` whose posts are pulled, not pushed."""
+    threshold = _pull_threshold()
+    if threshold is None or not author_ids:
+        return set()
+    return set(get_user_model().objects.filter(
+        pk__in=author_ids, follower_count__gte=threshold
+    ).values_list('pk', flat=True))
+
+
+def fan_out_post(post):
+    """Push a new post into the timeline of every follower of its author."""
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts):
+    """Push several new posts into their authors' followers' timelines."""
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.author_id].append(post)
+    pulled = pull_authors(list(by_author))
+    if pulled:
+        Post.objects.filter(
+            pk__in=[post.pk for author_id in pulled for post in by_author.pop(author_id)]
+        ).update(pulled=True)
+    if not by_author:
+        return
+
+    follows = _follows().filter(
+        from_user_id__in=list(by_author)
+    ).values_list('from_user_id', 'to_user_id')
+
+    batch = []
+    for author_id, follower_id in follows.iterator(chunk_size=BATCH_SIZE):
+        for post in by_author[author_id]:
+            batch.append(TimelineEntry(
+                user_id=follower_id,
+                post_id=post.pk,
+                created_at=post.created_at,
+            ))
+        if len(batch) >= BATCH_SIZE:
+            _insert(batch)
+            batch = []
+    if batch:
+        _insert(batch)
+
+
+def add_authors(user_id, author_ids):
+    """Copy the existing posts of newly followed authors into a timeline."""
+    posts = Post.objects.filter(
+        author_id__in=author_ids, pulled=False
+    ).values_list('id', 'created_at')
+
+    batch = []
+    for post_id, created_at in posts.iterator(chunk_size=BATCH_SIZE):
+        batch.append(TimelineEntry(
+            user_id=user_id, post_id=post_id, created_at=created_at
+        ))
+        if len(batch) >= BATCH_SIZE:
+            _insert(batch)
+            batch = []
+    if batch:
+        _insert(batch)
+
+
+def remove_authors(user_id, author_ids):
+    """Drop the posts of unfollowed authors from a timeline."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids
+    ).delete()
+
+
+def rebuild_timeline(user):
+    """Recompute one user's timeline from who they currently follow."""
+    author_ids = list(_follows().filter(
+        to_user_id=user.pk
+    ).values_list('from_user_id', flat=True))
+
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user=user).delete()
+        add_authors(user.pk, author_ids)
+
+
+def read_feed(user, direction, position, limit, keyset_slice, load_posts=True):
+    """
+    Return up to ``limit`` feed rows for ``user`` past ``position``.
+
+    Rows are TimelineEntry instances in the walking order expected by
+    KeysetPagination.paginate. Pushed entries and the pulled posts of
+    followed authors are read as two separately ordered streams and k-way
+    merged on (created_at, post id); pulled posts are wrapped in unsaved
+    entries.
+    With ``load_posts=False`` only post ids are read, not the posts.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    if load_posts:
+        entries = entries.select_related('post__author')
+    streams = [keyset_slice(
+        entries, direction, position, limit, fields=('created_at', 'post_id')
+    )]
+
+    posts = Post.objects.filter(pulled=True, author_id__in=_follows().filter(
+        to_user_id=user.pk
+    ).values('from_user_id'))
+    if load_posts:
+        posts = posts.select_related('author')
+    else:
+        posts = posts.only('id', 'created_at')
+    pulled = keyset_slice(
+        posts, direction, position, limit, fields=('created_at', 'id')
+    )
+    if not pulled:
+        return list(streams[0])
+
+    streams.append(
+        TimelineEntry(user=user, post=post, created_at=post.created_at)
+        for post in pulled
+    )
+    merged = heapq.merge(
+        *streams,
+        key=lambda entry: (entry.created_at, entry.post_id),
+        reverse=direction != 'after'
+    )
+    return list(islice(merged, limit))
@@ -0,0 +1,98 @@
+"""
+Time-decayed trending scores for posts.
+
+A post's score is the sum of its activity weights, each decayed by half
+every TRENDING_HALF_LIFE_HOURS. Rather than decaying every row as time
+passes, Post.trending_score stores the sum in log2 space relative to a
+fixed epoch:
+
+    trending_score = log2(sum(weight * 2 ** (hours_since_epoch / half_life)))
+
+Ordering by this column is the same as ordering by the decayed score at any
+moment, and a new event is folded in with a single atomic UPDATE computing
+log2(2 ** score + 2 ** event). Activity that is later undone (an unlike, a
+deleted comment) is folded back out the same way, using the time the like
+or comment was created, so toggling a like leaves the score where it was.
+"""
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Greatest, Log, Power
+from django.utils import timezone
+
+from .models import Post
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+
+
+def log_time(moment=None):
+    """Score of one unit of activity at ``moment`` (default: now)."""
+    moment = moment or timezone.now()
+    hours = (moment - EPOCH).total_seconds() / 3600
+    return hours / getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 6)
+
+
+# Smallest share of the score a removal leaves behind, where rounding makes
+# the difference vanish.
+MIN_REMAINDER = 2.0 ** -52
+
+
+def bump(weight):
+    """Expression adding an event of ``weight`` happening now to trending_score."""
+    event = Value(math.log2(weight) + log_time(), output_field=FloatField())
+    score = F('trending_score')
+    # log2(2**a + 2**b) == max(a, b) + log2(1 + 2**-|a - b|)
+    return Greatest(score, event) + Log(
+        Value(2.0), Value(1.0) + Power(Value(2.0), -Abs(score - event))
+    )
+
+
+def unbump(weight, moments):
+    """Expression removing events of ``weight`` that happened at ``moments``."""
+    events = [math.log2(weight) + log_time(moment) for moment in moments]
+    top = max(events)
+    removed = Value(
+        top + math.log2(sum(2 ** (event - top) for event in events)),
+        output_field=FloatField()
+    )
+    score = F('trending_score')
+    # log2(2**a - 2**b) == a + log2(1 - 2**(b - a))
+    return score + Log(Value(2.0), Greatest(
+        Value(1.0) - Power(Value(2.0), removed - score), Value(MIN_REMAINDER)
+    ))
+
+
+class TopPosts:
+    """Top-K trending post ids, refreshed every TRENDING_REFRESH_INTERVAL seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = []
+        self._expires = 0.0
+
+    def _refresh(self):
+        window = timedelta(hours=getattr(settings, 'TRENDING_WINDOW_HOURS', 48))
+        size = getattr(settings, 'TRENDING_CACHE_SIZE', 100)
+        self._ids = list(
+            Post.objects.filter(
+                created_at__gte=timezone.now() - window
+            ).order_by('-trending_score', '-id').values_list('id', flat=True)[:size]
+        )
+        self._expires = time.monotonic() + getattr(settings, 'TRENDING_REFRESH_INTERVAL', 30)
+
+    def ids(self, limit):
+        if time.monotonic() >= self._expires:
+            with self._lock:
+                if time.monotonic() >= self._expires:
+                    self._refresh()
+        return self._ids[:limit]
+
+
+top_posts = TopPosts()
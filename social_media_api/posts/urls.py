@@ -1,6 +1,6 @@
 from rest_framework.routers import DefaultRouter
 from .views import LikePostView, PostViewSet, CommentViewSet, UnlikePostView
-from .views import FeedView
+from .views import FeedView, TrendingView, LikeToggleView, ImportView
 from django.urls import path
 router = DefaultRouter()
 router.register('posts', PostViewSet, basename='posts')
@@ -9,8 +9,11 @@ router.register('comments', CommentViewSet, basename='comments')
 urlpatterns = router.urls
 urlpatterns += [
     path('feed/', FeedView.as_view(), name='feed'),
-    path('likes/', LikePostView.as_view(), name='like'),
-    path('unlikes/', UnlikePostView.as_view(), name='unlike'),
+    path('trending/', TrendingView.as_view(), name='trending'),
+    path('likes/<int:pk>/', LikePostView.as_view(), name='like'),
+    path('unlikes/<int:pk>/', UnlikePostView.as_view(), name='unlike'),
+    path('posts/<int:pk>/like/', LikeToggleView.as_view(), name='like-toggle'),
+    path('import/', ImportView.as_view(), name='import'),
     
     
 ]
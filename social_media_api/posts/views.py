@@ -1,73 +1,267 @@
 from django.shortcuts import render
 
 # Create your views here.
-from rest_framework import viewsets, permissions, filters
-from .models import Post, Comment
-from .serializers import PostSerializer, CommentSerializer
+from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+from .models import Post, Comment, attach_reply_previews, comment_preview_prefetch
+from .serializers import PostSerializer, CommentSerializer, CommentThreadSerializer
 from .permissions import IsOwnerOrReadOnly
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.parsers import MultiPartParser
 from django.shortcuts import get_object_or_404
 from .models import Like, Post
-from django.contrib.contenttypes.models import ContentType
-from notifications.models import Notification
+from . import conditional, counters, fastpath, likes, timeline, trending
+from .importer import ImportFailed, import_ndjson
+from .search import FullTextSearchFilter
+from notifications.dispatcher import dispatcher
+from social_media_api.fastpath import fast_path_enabled
+from social_media_api.fieldsets import SparseFieldsViewMixin, narrow_queryset, sparse_kwargs
+from social_media_api.pagination import KeysetPagination
 
 
-class PostViewSet(viewsets.ModelViewSet):
+# Author columns shown by ?expand=author, which the ETags must cover too.
+AUTHOR_COLUMNS = ('author__username', 'author__bio', 'author__profile_thumbnails')
+
+
+def _validator_row(model, pk, *fields):
+    """Fetch just the columns an object's ETag is built from."""
+    try:
+        return model.objects.filter(pk=pk).values_list(*fields).first()
+    except (TypeError, ValueError):
+        return None
+
+
+class PostViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all().order_by('-created_at')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
 
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['title', 'content']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'destroy':
+            return queryset
+        # Posts embed a capped comment preview; the full list is paginated
+        # by the comments action.
+        preview_size = settings.POSTS_COMMENT_PREVIEW_SIZE
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset.with_comment_preview(preview_size)
+
+        serializer = self.get_serializer()
+        if 'comments' in serializer.fields:
+            queryset = queryset.with_comment_preview(preview_size)
+        return narrow_queryset(queryset, serializer)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        version = conditional.collection_version(conditional.POSTS)
+        return conditional.respond(
+            request, conditional.make_etag('posts', version),
+            lambda: super(PostViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        row = _validator_row(
+            Post, self.kwargs['pk'],
+            'updated_at', 'last_activity_at', 'like_count', 'comment_count',
+            *AUTHOR_COLUMNS
+        )
+        if row is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional.respond(
+            request,
+            conditional.make_etag('post', self.kwargs['pk'], *row),
+            lambda: super(PostViewSet, self).retrieve(request, *args, **kwargs)
+        )
+
+    @action(detail=True, pagination_class=KeysetPagination)
+    def comments(self, request, pk=None):
+        row = _validator_row(Post, pk, 'last_activity_at', 'comment_count')
+        if row is None:
+            raise NotFound()
+        last_activity_at, comment_count = row
+        # Commenters' expanded profiles bump the comment collection version.
+        version = conditional.collection_version(conditional.COMMENTS)
+
+        def render():
+            sparse = sparse_kwargs(request)
+            threads = Comment.objects.filter(
+                post_id=pk, parent__isnull=True
+            ).select_related('author')
+            threads = self.paginate_queryset(narrow_queryset(
+                threads, CommentThreadSerializer(**sparse),
+                required=('post', 'path', 'created_at')
+            ))
+            attach_reply_previews(threads, settings.POSTS_COMMENT_REPLY_PREVIEW_SIZE)
+            serializer = CommentThreadSerializer(
+                threads, many=True, context=self.get_serializer_context(), **sparse
+            )
+            return self.get_paginated_response(serializer.data)
+
+        return conditional.respond(
+            request,
+            conditional.make_etag(
+                'post-comments', pk, version, last_activity_at, comment_count
+            ),
+            render
+        )
+
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().order_by('-created_at')
+class CommentViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related('author').order_by('-created_at')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in permissions.SAFE_METHODS:
+            queryset = narrow_queryset(queryset, self.get_serializer())
+        if self.action != 'list':
+            return queryset
+        # ?post= lists one post's comments, ?thread= one thread's replies,
+        # both in depth-first thread order off the (post, path) index.
+        params = self.request.query_params
+        try:
+            if 'thread' in params:
+                thread = Comment.objects.only('post_id', 'path').get(pk=int(params['thread']))
+                return queryset.filter(thread.subtree_range()).order_by('path')
+            if 'post' in params:
+                return queryset.filter(post_id=int(params['post'])).order_by('path')
+        except (ValueError, Comment.DoesNotExist):
+            return queryset.none()
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        version = conditional.collection_version(conditional.COMMENTS)
+        return conditional.respond(
+            request, conditional.make_etag('comments', version),
+            lambda: super(CommentViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        row = _validator_row(Comment, self.kwargs['pk'], 'updated_at', *AUTHOR_COLUMNS)
+        if row is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional.respond(
+            request,
+            conditional.make_etag('comment', self.kwargs['pk'], *row),
+            lambda: super(CommentViewSet, self).retrieve(request, *args, **kwargs)
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        counters.adjust_comments(comment.post_id, 1)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        counters.mark_activity(comment.post_id)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        post_id = instance.post_id
+        # Deleting a comment deletes its replies too.
+        removed = list(Comment.objects.filter(
+            Q(pk=instance.pk) | instance.subtree_range()
+        ).values_list('created_at', flat=True))
+        _, deleted = instance.delete()
+        counters.adjust_comments(
+            post_id, -deleted.get(Comment._meta.label, 0), removed=removed
+        )
+
+class FeedPagination(KeysetPagination):
+    cursor_fields = ('created_at', 'post_id')
+
 
 class FeedView(APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = FeedPagination
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        fast = fast_path_enabled(request)
+        entries = paginator.paginate(
+            lambda direction, position, limit: timeline.read_feed(
+                request.user, direction, position, limit,
+                paginator.keyset_slice, load_posts=not fast
+            ),
+            request
+        )
+        if fast:
+            return paginator.get_paginated_response(fastpath.render_posts(
+                [entry.post_id for entry in entries],
+                settings.POSTS_COMMENT_PREVIEW_SIZE, request
+            ))
+
+        posts = [entry.post for entry in entries]
+        serializer = PostSerializer(
+            posts, many=True, context={'request': request}, **sparse_kwargs(request)
+        )
+        if 'comments' in serializer.child.fields:
+            prefetch_related_objects(
+                posts, comment_preview_prefetch(settings.POSTS_COMMENT_PREVIEW_SIZE)
+            )
+        return paginator.get_paginated_response(serializer.data)
+
+
+class TrendingView(APIView):
+    permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        following_users = request.user.following.all()
-        posts = Post.objects.filter(
-            author__in=following_users
-        ).order_by('-created_at')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        ids = trending.top_posts.ids(limit)
+        sparse = sparse_kwargs(request)
+        fields = PostSerializer(**sparse)
+        posts = Post.objects.filter(pk__in=ids)
+        if 'comments' in fields.fields:
+            posts = posts.with_comment_preview(settings.POSTS_COMMENT_PREVIEW_SIZE)
+        posts = narrow_queryset(posts.select_related('author'), fields).in_bulk()
+        ranked = [posts[pk] for pk in ids if pk in posts]
+
+        serializer = PostSerializer(
+            ranked, many=True, context={'request': request}, **sparse
+        )
+        return Response({'results': serializer.data})
+
 
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
 class LikePostView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
 
-        like, created = Like.objects.get_or_create(
-            user=request.user,
-            post=post
-        )
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(
+                user=request.user,
+                post=post
+            )
+            if created:
+                counters.adjust_likes(post.pk, 1)
 
         if not created:
             return Response({"detail": "Already liked"}, status=400)
 
-        # Create notification
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb="liked your post",
-                content_type=ContentType.objects.get_for_model(post),
-                object_id=post.id
-            )
+        # Queue notification; the dispatcher coalesces and writes it later.
+        dispatcher.notify(
+            recipient_id=post.author_id,
+            actor_id=request.user.pk,
+            verb="liked your post",
+            target=post
+        )
 
         return Response({"detail": "Post liked"})
 
@@ -77,5 +271,83 @@ class UnlikePostView(APIView):
 
     def post(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
-        Like.objects.filter(user=request.user, post=post).delete()
-        return Response({"detail": "Post unliked"})
\ No newline at end of file
+        with transaction.atomic():
+            liked_at = likes.delete_like(request.user.pk, post.pk)
+            if liked_at is not None:
+                counters.adjust_likes(post.pk, -1, removed=[liked_at])
+        return Response({"detail": "Post unliked"})
+
+
+class LikeToggleView(APIView):
+    """
+    PUT likes and DELETE unlikes a post. Both are idempotent and return the
+    resulting state, so repeated or concurrent taps are safe.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def _respond(self, request, pk, liked):
+        with transaction.atomic():
+            if liked:
+                changed = likes.insert_like(request.user.pk, pk)
+                if changed:
+                    counters.adjust_likes(pk, 1)
+            else:
+                liked_at = likes.delete_like(request.user.pk, pk)
+                changed = liked_at is not None
+                if changed:
+                    counters.adjust_likes(pk, -1, removed=[liked_at])
+            row = Post.objects.filter(pk=pk).values_list('like_count', 'author_id').first()
+            if row is None:
+                # Rolls back the insert; SQLite only checks the FK at commit.
+                raise NotFound()
+
+        like_count, author_id = row
+        if liked and changed:
+            dispatcher.notify(
+                recipient_id=author_id,
+                actor_id=request.user.pk,
+                verb="liked your post",
+                target=Post(pk=pk)
+            )
+        return Response({'liked': liked, 'like_count': like_count})
+
+    def put(self, request, pk):
+        return self._respond(request, pk, liked=True)
+
+    def delete(self, request, pk):
+        return self._respond(request, pk, liked=False)
+
+
+class ImportView(APIView):
+    """Staff-only bulk import of an uploaded NDJSON file (see posts.importer)."""
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "Upload an NDJSON file as 'file'."}, status=400)
+        try:
+            start_line = max(int(request.data.get('start_line', 1)), 1)
+            chunk_size = min(max(int(request.data.get('chunk_size', 1000)), 1), 5000)
+        except ValueError:
+            return Response({"detail": "start_line and chunk_size must be integers."}, status=400)
+
+        run_id = request.data.get('run_id') or None
+        if run_id is not None and len(run_id) > 32:
+            return Response({"detail": "run_id is at most 32 characters."}, status=400)
+
+        lines = (line.decode('utf-8') for line in upload)
+        try:
+            stats = import_ndjson(
+                lines, chunk_size=chunk_size, start_line=start_line, run_id=run_id
+            )
+        except ImportFailed as exc:
+            return Response(
+                {"detail": str(exc), "resume_line": exc.line, "run_id": exc.run_id,
+                 **exc.stats.as_dict()},
+                status=400
+            )
+        except UnicodeDecodeError:
+            return Response({"detail": "The file must be UTF-8 encoded."}, status=400)
+        return Response(stats.as_dict())
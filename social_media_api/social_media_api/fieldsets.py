@@ -0,0 +1,112 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=id,title`` limits a response to the named fields, and
+``?expand=author`` swaps a flat field for the nested representation declared
+in the serializer's ``Meta.expandable_fields``. Views narrow their querysets
+with ``narrow_queryset`` to the columns the remaining fields read, so unused
+columns are neither fetched nor serialized.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _is_column(model, path):
+    """True if ``path`` ('field' or 'fk__field') names a concrete column."""
+    *relations, name = path.split('__')
+    try:
+        for relation in relations:
+            field = model._meta.get_field(relation)
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                return False
+            model = field.related_model
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+def sparse_kwargs(request):
+    """Serializer keyword arguments for the request's ?fields= and ?expand=."""
+    kwargs = {}
+    if request is None:
+        return kwargs
+    if 'fields' in request.query_params:
+        kwargs['fields'] = _names(request.query_params['fields'])
+    if 'expand' in request.query_params:
+        kwargs['expand'] = _names(request.query_params['expand'])
+    return kwargs
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin taking ``fields`` and ``expand`` keyword arguments.
+
+    ``Meta.expandable_fields`` maps a field name to a callable returning its
+    expanded field. ``Meta.field_columns`` lists the columns read by fields
+    that are not plain model attributes (method fields, properties); an
+    empty tuple means the field reads none.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand or ():
+            if name in expandable:
+                self.fields[name] = expandable[name]()
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def columns(self):
+        """Model columns read by the selected fields, or None if unknown."""
+        model = self.Meta.model
+        declared = getattr(self.Meta, 'field_columns', {})
+        columns = {model._meta.pk.name}
+        for name, field in self.fields.items():
+            if name in declared:
+                columns.update(declared[name])
+            elif isinstance(field, SparseFieldsMixin) and not field.source == '*':
+                nested = field.columns()
+                if nested is None:
+                    return None
+                prefix = field.source.replace('.', '__')
+                columns.update(f'{prefix}__{column}' for column in nested)
+            elif isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                return None
+            else:
+                path = field.source.replace('.', '__')
+                if field.source == '*' or not _is_column(model, path):
+                    return None
+                columns.add(path)
+        return columns
+
+
+def narrow_queryset(queryset, serializer, required=()):
+    """
+    Load only the columns ``serializer`` reads (plus ``required``), following
+    just the foreign keys those columns need. Returns ``queryset`` unchanged
+    when a selected field's columns cannot be determined.
+    """
+    columns = serializer.columns()
+    if columns is None:
+        return queryset
+    columns.update(required)
+    relations = {column.rsplit('__', 1)[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns)
+
+
+class SparseFieldsViewMixin:
+    """Generic view mixin passing ?fields= and ?expand= to serializers on reads."""
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in SAFE_METHODS:
+            kwargs.update(sparse_kwargs(self.request))
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,157 @@
+"""
+Keyset pagination for newest-first lists.
+
+Pages are addressed by an opaque cursor encoding the (timestamp, id) of a row
+rather than by page number, so fetching a page deep in the list costs the same
+as fetching the first one: no COUNT(*) and no OFFSET scan.
+
+Clients pass ``?before=<cursor>`` to scroll towards older rows and
+``?after=<cursor>`` to fetch rows newer than the ones they already have.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    before_query_param = 'before'
+    after_query_param = 'after'
+    # (timestamp, tiebreaker) fields, both read newest-first.
+    cursor_fields = ('created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        def fetch(direction, position, limit):
+            return self.keyset_slice(queryset, direction, position, limit)
+
+        return self.paginate(fetch, request)
+
+    def keyset_slice(self, queryset, direction, position, limit, fields=None):
+        """Return up to ``limit`` rows of ``queryset`` past ``position``."""
+        time_field, id_field = fields or self.cursor_fields
+        if direction == 'after':
+            if position:
+                queryset = queryset.filter(
+                    Q(**{f'{time_field}__gt': position[0]})
+                    | Q(**{time_field: position[0], f'{id_field}__gt': position[1]})
+                )
+            return queryset.order_by(time_field, id_field)[:limit]
+
+        if position:
+            queryset = queryset.filter(
+                Q(**{f'{time_field}__lt': position[0]})
+                | Q(**{time_field: position[0], f'{id_field}__lt': position[1]})
+            )
+        return queryset.order_by(f'-{time_field}', f'-{id_field}')[:limit]
+
+    def paginate(self, fetch, request):
+        """
+        Paginate any newest-first source.
+
+        ``fetch(direction, position, limit)`` must return up to ``limit`` rows
+        past ``position`` in walking order: newest-first when ``direction``
+        is 'before' (or None for the first page), oldest-first for 'after'.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.direction, position = self.decode_cursor(request)
+
+        rows = list(fetch(self.direction, position, self.page_size + 1))
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.direction == 'after':
+            rows.reverse()
+
+        self.first_position = self.get_position(rows[0]) if rows else None
+        self.last_position = self.get_position(rows[-1]) if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_position(self, row):
+        if isinstance(row, dict):
+            # values() rows
+            return tuple(row[field] for field in self.cursor_fields)
+        return tuple(getattr(row, field) for field in self.cursor_fields)
+
+    def decode_cursor(self, request):
+        before = request.query_params.get(self.before_query_param)
+        after = request.query_params.get(self.after_query_param)
+        if before and after:
+            raise ParseError(
+                f"Use either '{self.before_query_param}' or "
+                f"'{self.after_query_param}', not both."
+            )
+        if not (before or after):
+            return None, None
+
+        try:
+            raw = urlsafe_b64decode(before or after).decode('ascii')
+            timestamp, pk = raw.rsplit('|', 1)
+            position = (parse_datetime(timestamp), int(pk))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return ('before' if before else 'after'), position
+
+    def encode_cursor(self, position):
+        timestamp, pk = position
+        raw = f'{timestamp.isoformat()}|{pk}'
+        return urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def _link(self, param, position):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, self.encode_cursor(position))
+
+    def get_next_link(self):
+        # Paging 'after' a cursor always leaves at least the cursor row behind.
+        if self.last_position and (self.has_more or self.direction == 'after'):
+            return self._link(self.before_query_param, self.last_position)
+        return None
+
+    def get_previous_link(self):
+        if not self.first_position:
+            return None
+        if self.direction == 'before' or (self.direction == 'after' and self.has_more):
+            return self._link(self.after_query_param, self.first_position)
+        return None
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
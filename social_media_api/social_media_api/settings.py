@@ -131,6 +131,14 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Stream every upload to a temporary file instead of buffering small ones in memory.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -139,9 +147,78 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': 
     [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
-}
\ No newline at end of file
+}
+
+# Feed delivery: 'push' fans every post out to followers' timelines on write.
+# 'hybrid' skips the fan-out for authors with at least FEED_FANOUT_THRESHOLD
+# followers and merges their posts into the feed at read time instead.
+FEED_MODE = 'hybrid'
+FEED_FANOUT_THRESHOLD = 10000
+
+# Number of latest comments embedded in each post on list and feed pages.
+# The full list is paged through /api/posts/posts/<id>/comments/.
+POSTS_COMMENT_PREVIEW_SIZE = 3
+
+# Replies shown under each top-level comment on that paged thread listing.
+POSTS_COMMENT_REPLY_PREVIEW_SIZE = 3
+
+# "Who to follow" suggestions: seconds a user's ranked list is cached, and
+# maximum age of the in-memory follow graph snapshot they are computed from.
+SUGGESTIONS_CACHE_TTL = 300
+SUGGESTIONS_SNAPSHOT_MAX_AGE = 600
+
+# Notifications are written by a background dispatcher. Events for the same
+# recipient, verb and target are folded into one unread notification if it
+# was written within NOTIFICATION_COALESCE_WINDOW seconds.
+NOTIFICATIONS_ASYNC = True
+NOTIFICATION_FLUSH_INTERVAL = 2
+NOTIFICATION_COALESCE_WINDOW = 300
+
+# Seconds a recipient's unread-notification count is cached (None disables).
+NOTIFICATION_UNREAD_CACHE_TTL = 60
+
+# Read notifications older than NOTIFICATION_RETENTION_DAYS are moved to the
+# archive by `manage.py archive_notifications`, or in-process every
+# NOTIFICATION_RETENTION_INTERVAL seconds when that is set.
+NOTIFICATION_RETENTION_DAYS = 30
+NOTIFICATION_RETENTION_INTERVAL = None
+
+# Real-time notifications over Server-Sent Events (requires ASGI).
+# NOTIFICATION_BROKER_BACKEND can point at a multi-worker BrokerBackend.
+NOTIFICATION_BROKER_BACKEND = 'notifications.broker.InMemoryBroker'
+NOTIFICATION_STREAM_HEARTBEAT = 15
+NOTIFICATION_STREAM_MAX_AGE = 300
+NOTIFICATION_STREAM_QUEUE_SIZE = 100
+
+# Maximum number of ranked matches returned by full-text post search.
+POSTS_SEARCH_MAX_RESULTS = 1000
+
+# Trending posts: activity halves in weight every TRENDING_HALF_LIFE_HOURS;
+# the top TRENDING_CACHE_SIZE posts from the last TRENDING_WINDOW_HOURS are
+# cached in memory and refreshed every TRENDING_REFRESH_INTERVAL seconds.
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_WINDOW_HOURS = 48
+TRENDING_CACHE_SIZE = 100
+TRENDING_REFRESH_INTERVAL = 30
+
+# Token -> user lookups cached in-process by CachedTokenAuthentication.
+TOKEN_AUTH_CACHE_TTL = 60
+TOKEN_AUTH_CACHE_SIZE = 10000
+
+# Rows fetched per query while streaming an account data export.
+ACCOUNT_EXPORT_CHUNK_SIZE = 2000
+
+# Square profile picture thumbnails (pixels), rendered as WebP and JPEG by a
+# background pool of PROFILE_THUMBNAIL_WORKERS threads after each upload.
+PROFILE_THUMBNAIL_SIZES = (48, 128)
+PROFILE_THUMBNAIL_WORKERS = 2
+PROFILE_THUMBNAILS_ASYNC = True
+
+# Render feed and notification pages straight from values() rows instead of
+# through serializers, unless a request asks for ?fields= or ?expand=.
+API_FAST_READ_PATH = True
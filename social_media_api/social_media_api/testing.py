@@ -0,0 +1,18 @@
+"""Helpers shared by the apps' tests."""
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+class SecureAPIClient(APIClient):
+    """APIClient sending every request over HTTPS, as SECURE_SSL_REDIRECT requires."""
+
+    def generic(self, *args, secure=True, **kwargs):
+        return super().generic(*args, secure=secure, **kwargs)
+
+
+def client_for(user):
+    """A client authenticated as ``user`` with the user's API token."""
+    token, _ = Token.objects.get_or_create(user=user)
+    client = SecureAPIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client